@@ -0,0 +1,260 @@
+package server
+
+import (
+	"archive/zip"
+	"compress/flate"
+	"encoding/json"
+	"fmt"
+	"io"
+	"net/http"
+	"os"
+	"path/filepath"
+	"strconv"
+	"strings"
+	"sync"
+	"time"
+)
+
+// 打包下载：/api/bundle 把 info 目录的全部文件打成一个 zip，远程客户端一次请求取得全部文件；
+// ?since=版本号（见 /api/changes）只打包该版本之后变化的文件，已删除的文件列在包内清单中；
+// 带 ?w=&h= 时图片换成缩略图（同 /download）。
+// 完整压缩包按目录版本与缩略图尺寸缓存在 info/.bundle 下，目录未变化时直接发送（支持 Range 续传与 304）；
+// 增量压缩包通常很小，每次请求时边生成边发送
+const (
+	// bundleDir info 目录下存放完整压缩包的子目录（与 .partial 一样不出现在文件列表中，也无法被下载）
+	bundleDir = ".bundle"
+	// bundleManifestName 包内清单；名称带目录，不会与 info 目录中的文件重名
+	bundleManifestName = ".bundle/manifest.json"
+	// maxCachedBundles 最多缓存的完整压缩包数（每种缩略图尺寸一个）
+	maxCachedBundles = 4
+)
+
+// storedExts 已压缩的格式在包内只存储，不再压缩
+var storedExts = map[string]bool{
+	".jpg": true, ".jpeg": true, ".png": true, ".gif": true, ".webp": true,
+	".zip": true, ".7z": true, ".rar": true, ".gz": true, ".xz": true, ".bz2": true,
+	".mp3": true, ".mp4": true,
+}
+
+// bundleEntry 包内清单中的文件；hash 为原文件的内容哈希，variant 为实际使用的缩略图尺寸（原样打包时为空）
+type bundleEntry struct {
+	FileInfo
+	Variant string `json:"variant,omitempty"`
+}
+
+// bundleManifest 包内清单
+type bundleManifest struct {
+	Version uint64 `json:"version"`
+	// Full 为 true 表示包含全部文件（未带 since，或 since 早于保留的变化记录），客户端应删除清单外的本地副本
+	Full    bool          `json:"full"`
+	Files   []bundleEntry `json:"files"`
+	Deleted []string      `json:"deleted"`
+}
+
+// cachedBundle 磁盘上的完整压缩包
+type cachedBundle struct {
+	version uint64
+	path    string
+	modTime time.Time
+}
+
+// bundleCache 完整压缩包缓存，键为缩略图尺寸（原图为空）；同一时间只生成一个压缩包
+type bundleCache struct {
+	mu    sync.Mutex
+	files map[string]cachedBundle
+}
+
+// addBundleFile 把一个文件（或其缩略图）写入压缩包；文件已不存在时返回 false
+func (s *InfoServer) addBundleFile(zw *zip.Writer, name string, maxW, maxH int) (bundleEntry, bool, error) {
+	path := filepath.Join(s.InfoFolder, name)
+	info, err := os.Stat(path)
+	if err != nil || !info.Mode().IsRegular() {
+		return bundleEntry{}, false, nil
+	}
+	mtimeNs := info.ModTime().UnixNano()
+	sum, err := s.hashes.get(path, info.Size(), mtimeNs)
+	if err != nil {
+		return bundleEntry{}, false, nil
+	}
+	entry := bundleEntry{FileInfo: stampInfo(name, fileStamp{size: info.Size(), mtimeNs: mtimeNs})}
+	entry.Hash = sum
+	ext := strings.ToLower(filepath.Ext(name))
+	hdr := &zip.FileHeader{Name: name, Method: zip.Deflate, Modified: info.ModTime()}
+	if storedExts[ext] {
+		hdr.Method = zip.Store
+	}
+
+	if maxW > 0 && variantExts[ext] {
+		if data := s.variant(path, info, sum, maxW, maxH); data != nil {
+			entry.Variant = fmt.Sprintf("%dx%d", maxW, maxH)
+			hdr.Method = zip.Store
+			w, err := zw.CreateHeader(hdr)
+			if err == nil {
+				_, err = w.Write(data)
+			}
+			return entry, err == nil, err
+		}
+	}
+
+	f, err := os.Open(path)
+	if err != nil {
+		return bundleEntry{}, false, nil
+	}
+	defer f.Close()
+	w, err := zw.CreateHeader(hdr)
+	if err == nil {
+		_, err = io.CopyBuffer(w, f, make([]byte, uploadBufferSize))
+	}
+	return entry, err == nil, err
+}
+
+// writeBundle 依次写入 names 中的文件与包内清单；打包前已删除的文件记入 deleted
+func (s *InfoServer) writeBundle(zw *zip.Writer, m bundleManifest, names []string, maxW, maxH int) error {
+	m.Files = []bundleEntry{}
+	if m.Deleted == nil {
+		m.Deleted = []string{}
+	}
+	for _, name := range names {
+		entry, ok, err := s.addBundleFile(zw, name, maxW, maxH)
+		if err != nil {
+			return err
+		}
+		if ok {
+			m.Files = append(m.Files, entry)
+		} else if !m.Full {
+			m.Deleted = append(m.Deleted, name)
+		}
+	}
+	w, err := zw.Create(bundleManifestName)
+	if err != nil {
+		return err
+	}
+	if err := json.NewEncoder(w).Encode(m); err != nil {
+		return err
+	}
+	return zw.Close()
+}
+
+// fullBundle 打开当前目录版本的完整压缩包，没有时先生成。
+// 版本号在读取文件前取得，生成期间发生的变化会使下一次请求重新生成
+func (s *InfoServer) fullBundle(maxW, maxH int) (*os.File, cachedBundle, error) {
+	key := ""
+	if maxW > 0 {
+		key = fmt.Sprintf("%dx%d", maxW, maxH)
+	}
+	version := s.watch.current()
+	c := s.bundles
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	if b, ok := c.files[key]; ok && b.version == version {
+		f, err := os.Open(b.path)
+		if err == nil {
+			return f, b, nil
+		}
+	}
+
+	dir := filepath.Join(s.InfoFolder, bundleDir)
+	if err := os.MkdirAll(dir, 0o755); err != nil {
+		return nil, cachedBundle{}, err
+	}
+	tmp, err := os.CreateTemp(dir, "full-*.zip")
+	if err != nil {
+		return nil, cachedBundle{}, err
+	}
+	zw := zip.NewWriter(tmp)
+	// 完整压缩包生成一次、发送多次，使用最高压缩率
+	zw.RegisterCompressor(zip.Deflate, func(w io.Writer) (io.WriteCloser, error) {
+		return flate.NewWriter(w, flate.BestCompression)
+	})
+	all := s.watch.index.all()
+	names := make([]string, len(all))
+	for i, f := range all {
+		names[i] = f.Name
+	}
+	err = s.writeBundle(zw, bundleManifest{Version: version, Full: true}, names, maxW, maxH)
+	if err == nil {
+		_, err = tmp.Seek(0, io.SeekStart)
+	}
+	var info os.FileInfo
+	if err == nil {
+		info, err = tmp.Stat()
+	}
+	if err != nil {
+		tmp.Close()
+		_ = os.Remove(tmp.Name())
+		return nil, cachedBundle{}, err
+	}
+
+	b := cachedBundle{version: version, path: tmp.Name(), modTime: info.ModTime()}
+	c.files[key] = b
+	for k := range c.files {
+		if len(c.files) <= maxCachedBundles {
+			break
+		}
+		if k != key {
+			delete(c.files, k)
+		}
+	}
+	// 删除已不再引用的旧压缩包（Windows 下正在发送的文件删除失败，下次生成时再删）
+	if entries, err := os.ReadDir(dir); err == nil {
+		keep := make(map[string]bool, len(c.files))
+		for _, cb := range c.files {
+			keep[filepath.Base(cb.path)] = true
+		}
+		for _, e := range entries {
+			if !keep[e.Name()] {
+				_ = os.Remove(filepath.Join(dir, e.Name()))
+			}
+		}
+	}
+	return tmp, b, nil
+}
+
+// handleBundle 打包下载；响应头 X-Bundle-Version 为包内文件对应的目录版本，
+// 客户端解包后以此作为下一次增量打包的 since
+func (s *InfoServer) handleBundle(w http.ResponseWriter, r *http.Request) {
+	maxW, maxH, ok := variantSize(r)
+	if !ok {
+		maxW, maxH = 0, 0
+	}
+	if since, hasSince := parseSince(r); hasSince {
+		events, version, reset, _ := s.watch.since(since)
+		// since 早于保留的变化记录（或服务已重启）时发送完整压缩包
+		if !reset {
+			m := bundleManifest{Version: version, Deleted: []string{}}
+			var names []string
+			for _, e := range events {
+				if e.Op == "deleted" {
+					m.Deleted = append(m.Deleted, e.Name)
+				} else {
+					names = append(names, e.Name)
+				}
+			}
+			w.Header().Set("Content-Type", "application/zip")
+			w.Header().Set("Content-Disposition", `attachment; filename="info-delta.zip"`)
+			w.Header().Set("Cache-Control", "no-cache")
+			w.Header().Set("X-Bundle-Version", strconv.FormatUint(version, 10))
+			if r.Method == http.MethodHead {
+				return
+			}
+			// 响应头已发出，中途出错时只能截断响应，客户端读取压缩包时会发现不完整
+			_ = s.writeBundle(zip.NewWriter(w), m, names, maxW, maxH)
+			return
+		}
+	}
+
+	f, b, err := s.fullBundle(maxW, maxH)
+	if err != nil {
+		writeJSONStatus(w, http.StatusInternalServerError, map[string]any{
+			"success": false,
+			"message": "打包失败: " + err.Error(),
+		})
+		return
+	}
+	defer f.Close()
+	w.Header().Set("Content-Type", "application/zip")
+	w.Header().Set("Content-Disposition", `attachment; filename="info.zip"`)
+	w.Header().Set("X-Bundle-Version", strconv.FormatUint(b.version, 10))
+	w.Header().Set("ETag", fmt.Sprintf(`"bundle-%d-%dx%d"`, b.version, maxW, maxH))
+	http.ServeContent(w, r, "info.zip", b.modTime, f)
+}
@@ -0,0 +1,193 @@
+package server
+
+import (
+	"container/list"
+	"os"
+	"sync"
+	"time"
+)
+
+// 内容缓存容量：总字节数上限与单项上限（更大的文件直接从磁盘发送）
+const (
+	contentCacheMaxBytes = 64 << 20
+	contentCacheMaxEntry = 8 << 20
+)
+
+// listingTTL 目录列表缓存时间；目录 mtime 变化（增删改名）或本服务写入文件时立即失效，
+// 外部程序原地修改文件内容不会改变目录 mtime，最多延迟该时间后可见
+const listingTTL = 2 * time.Second
+
+// lruEntry 缓存的内容及其对应的文件状态
+type lruEntry struct {
+	key     string
+	path    string
+	size    int64
+	mtimeNs int64
+	data    []byte
+}
+
+// contentCache 按总字节数限制的 LRU 内容缓存（文件内容、gzip 版本），
+// 取用时比对文件大小与 mtime，变化则视为未命中
+type contentCache struct {
+	mu       sync.Mutex
+	maxBytes int64
+	used     int64
+	ll       *list.List
+	items    map[string]*list.Element
+
+	hits      uint64
+	misses    uint64
+	evictions uint64
+}
+
+func newContentCache(maxBytes int64) *contentCache {
+	return &contentCache{maxBytes: maxBytes, ll: list.New(), items: make(map[string]*list.Element)}
+}
+
+// get 返回与 size/mtimeNs 一致的缓存内容
+func (c *contentCache) get(key string, size, mtimeNs int64) ([]byte, bool) {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	el, ok := c.items[key]
+	if !ok {
+		c.misses++
+		return nil, false
+	}
+	e := el.Value.(*lruEntry)
+	if e.size != size || e.mtimeNs != mtimeNs {
+		c.removeElement(el)
+		c.misses++
+		return nil, false
+	}
+	c.ll.MoveToFront(el)
+	c.hits++
+	return e.data, true
+}
+
+// put 写入缓存，超出容量时淘汰最久未使用的项
+func (c *contentCache) put(key, path string, size, mtimeNs int64, data []byte) {
+	n := int64(len(data))
+	if n > contentCacheMaxEntry || n > c.maxBytes {
+		return
+	}
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	if el, ok := c.items[key]; ok {
+		c.removeElement(el)
+	}
+	c.items[key] = c.ll.PushFront(&lruEntry{key: key, path: path, size: size, mtimeNs: mtimeNs, data: data})
+	c.used += n
+	for c.used > c.maxBytes {
+		c.removeElement(c.ll.Back())
+		c.evictions++
+	}
+}
+
+func (c *contentCache) removeElement(el *list.Element) {
+	e := c.ll.Remove(el).(*lruEntry)
+	delete(c.items, e.key)
+	c.used -= int64(len(e.data))
+}
+
+// prune 删除已不存在文件的缓存项
+func (c *contentCache) prune(alive map[string]bool) {
+	c.mu.Lock()
+	for _, el := range c.items {
+		if !alive[el.Value.(*lruEntry).path] {
+			c.removeElement(el)
+		}
+	}
+	c.mu.Unlock()
+}
+
+// stats 返回命中统计
+func (c *contentCache) stats() map[string]any {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	return map[string]any{
+		"hits":      c.hits,
+		"misses":    c.misses,
+		"evictions": c.evictions,
+		"entries":   len(c.items),
+		"bytes":     c.used,
+	}
+}
+
+// nonEmpty 内容缓存中以空内容表示“不使用该版本”（压缩无收益、无需缩略图），取出时转为 nil
+func nonEmpty(data []byte) []byte {
+	if len(data) == 0 {
+		return nil
+	}
+	return data
+}
+
+// fileBytes 读取文件内容，不超过单项上限的文件经内容缓存读取；
+// 文件过大返回 nil，由调用方直接从磁盘发送
+func (s *InfoServer) fileBytes(path string, info os.FileInfo) ([]byte, error) {
+	if info.Size() > contentCacheMaxEntry {
+		return nil, nil
+	}
+	mtimeNs := info.ModTime().UnixNano()
+	if data, ok := s.content.get(path, info.Size(), mtimeNs); ok {
+		return data, nil
+	}
+	data, err := os.ReadFile(path)
+	if err != nil {
+		return nil, err
+	}
+	// 读取期间文件被改写时不缓存
+	if int64(len(data)) == info.Size() {
+		s.content.put(path, path, info.Size(), mtimeNs, data)
+	}
+	return data, nil
+}
+
+// listingCache 目录列表缓存
+type listingCache struct {
+	mu       sync.Mutex
+	files    []FileInfo
+	dirMtime time.Time
+	expires  time.Time
+	valid    bool
+
+	hits   uint64
+	misses uint64
+}
+
+// get 返回缓存的列表副本；目录 mtime 变化或超过 listingTTL 时未命中
+func (c *listingCache) get(dirMtime time.Time) ([]FileInfo, bool) {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	if !c.valid || !c.dirMtime.Equal(dirMtime) || time.Now().After(c.expires) {
+		c.misses++
+		return nil, false
+	}
+	c.hits++
+	return append([]FileInfo(nil), c.files...), true
+}
+
+func (c *listingCache) put(dirMtime time.Time, files []FileInfo) {
+	c.mu.Lock()
+	c.files = append([]FileInfo(nil), files...)
+	c.dirMtime = dirMtime
+	c.expires = time.Now().Add(listingTTL)
+	c.valid = true
+	c.mu.Unlock()
+}
+
+// invalidate 本服务写入文件后调用
+func (c *listingCache) invalidate() {
+	c.mu.Lock()
+	c.valid = false
+	c.mu.Unlock()
+}
+
+// cacheStats 返回内容缓存与目录列表缓存的统计
+func (s *InfoServer) cacheStats() map[string]any {
+	st := s.content.stats()
+	s.listing.mu.Lock()
+	st["listing_hits"] = s.listing.hits
+	st["listing_misses"] = s.listing.misses
+	s.listing.mu.Unlock()
+	return st
+}
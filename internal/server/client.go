@@ -20,6 +20,8 @@ type FileInfo struct {
 	Name     string `json:"name"`
 	Size     int64  `json:"size"`
 	Modified string `json:"modified"`
+	MTimeNs  int64  `json:"mtime_ns,omitempty"`
+	Hash     string `json:"hash,omitempty"`
 }
 
 // Client 配置信息服务器客户端
@@ -91,6 +93,31 @@ func (c *Client) FetchFiles() []FileInfo {
 	return data.Files
 }
 
+// Manifest 服务器清单：状态信息与带内容哈希的文件列表
+type Manifest struct {
+	Success    bool       `json:"success"`
+	Port       int        `json:"port"`
+	FilesCount int        `json:"files_count"`
+	Files      []FileInfo `json:"files"`
+}
+
+// FetchManifest 一次请求获取服务器状态与文件列表，服务器不可用时返回 false
+func (c *Client) FetchManifest() (bool, *Manifest) {
+	resp, err := c.get("/api/manifest")
+	if err != nil {
+		return false, nil
+	}
+	defer resp.Body.Close()
+	if resp.StatusCode != 200 {
+		return false, nil
+	}
+	var m Manifest
+	if err := json.NewDecoder(resp.Body).Decode(&m); err != nil {
+		return false, nil
+	}
+	return m.Success, &m
+}
+
 // DownloadToCache 下载文件到本地缓存，返回本地路径
 func (c *Client) DownloadToCache(filename string) (string, error) {
 	resp, err := c.get("/download/" + filename)
@@ -0,0 +1,112 @@
+package server
+
+import (
+	"bytes"
+	"compress/gzip"
+	"net/http"
+	"os"
+	"path/filepath"
+	"strconv"
+	"strings"
+	"sync"
+)
+
+// maxGzipFileSize 超过该大小的文件不做压缩，直接原样发送
+const maxGzipFileSize = contentCacheMaxEntry
+
+// compressibleExts 值得压缩的文本类扩展名（图片、安装包等已压缩格式不处理）
+var compressibleExts = map[string]bool{
+	".txt": true, ".md": true, ".log": true, ".json": true, ".xml": true,
+	".html": true, ".htm": true, ".css": true, ".js": true, ".py": true,
+	".ini": true, ".conf": true, ".cfg": true, ".csv": true, ".yaml": true,
+	".yml": true, ".bat": true, ".ps1": true, ".sh": true, ".svg": true,
+}
+
+// acceptsGzip 请求的 Accept-Encoding 是否接受 gzip（q=0 视为拒绝）
+func acceptsGzip(r *http.Request) bool {
+	for _, part := range strings.Split(r.Header.Get("Accept-Encoding"), ",") {
+		name, params, _ := strings.Cut(strings.TrimSpace(part), ";")
+		if name != "gzip" && name != "*" {
+			continue
+		}
+		if q, ok := strings.CutPrefix(strings.TrimSpace(params), "q="); ok {
+			if v, err := strconv.ParseFloat(q, 64); err == nil && v == 0 {
+				return false
+			}
+		}
+		return true
+	}
+	return false
+}
+
+// gzipped 返回文件的 gzip 版本（BestCompression，经内容缓存按 mtime/大小失效，重复下载不再消耗 CPU）；
+// 文件不适合压缩或压缩后不更小时返回 nil
+func (s *InfoServer) gzipped(path string, info os.FileInfo) []byte {
+	if info.Size() > maxGzipFileSize || !compressibleExts[strings.ToLower(filepath.Ext(path))] {
+		return nil
+	}
+	key := "gzip:" + path
+	mtimeNs := info.ModTime().UnixNano()
+	if data, ok := s.content.get(key, info.Size(), mtimeNs); ok {
+		// 空结果表示压缩无收益
+		return nonEmpty(data)
+	}
+
+	raw, err := s.fileBytes(path, info)
+	if err != nil || raw == nil {
+		return nil
+	}
+	var buf bytes.Buffer
+	zw, _ := gzip.NewWriterLevel(&buf, gzip.BestCompression)
+	_, _ = zw.Write(raw)
+	_ = zw.Close()
+	data := buf.Bytes()
+	if len(data) >= len(raw) {
+		// 压缩无收益，缓存空结果避免重复尝试
+		data = []byte{}
+	}
+	s.content.put(key, path, info.Size(), mtimeNs, data)
+	return nonEmpty(data)
+}
+
+var gzipWriters = sync.Pool{
+	New: func() any {
+		zw, _ := gzip.NewWriterLevel(nil, gzip.BestSpeed)
+		return zw
+	},
+}
+
+// gzipResponseWriter 将响应体写入 gzip 压缩流
+type gzipResponseWriter struct {
+	http.ResponseWriter
+	zw    *gzip.Writer
+	wrote bool
+}
+
+func (g *gzipResponseWriter) Write(b []byte) (int, error) {
+	g.wrote = true
+	return g.zw.Write(b)
+}
+
+// gzipJSON 客户端接受 gzip 时压缩 JSON 接口的响应
+func gzipJSON(next http.HandlerFunc) http.HandlerFunc {
+	return func(w http.ResponseWriter, r *http.Request) {
+		w.Header().Add("Vary", "Accept-Encoding")
+		if !acceptsGzip(r) {
+			next(w, r)
+			return
+		}
+		w.Header().Set("Content-Encoding", "gzip")
+		zw := gzipWriters.Get().(*gzip.Writer)
+		zw.Reset(w)
+		gw := &gzipResponseWriter{ResponseWriter: w, zw: zw}
+		defer func() {
+			// 304 等无响应体时不写出空的 gzip 流
+			if gw.wrote {
+				_ = zw.Close()
+			}
+			gzipWriters.Put(zw)
+		}()
+		next(gw, r)
+	}
+}
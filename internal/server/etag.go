@@ -0,0 +1,54 @@
+package server
+
+import (
+	"crypto/sha256"
+	"encoding/hex"
+	"encoding/json"
+	"net/http"
+	"strings"
+)
+
+// strongETag 由内容哈希生成强 ETag；gzip 表示形式内容不同，加后缀区分
+func strongETag(hash string, gzipped bool) string {
+	if gzipped {
+		return `"` + hash + `-gz"`
+	}
+	return `"` + hash + `"`
+}
+
+// etagMatches 请求的 If-None-Match 是否包含该 ETag（If-None-Match 按弱比较，忽略 W/ 前缀）
+func etagMatches(r *http.Request, etag string) bool {
+	inm := r.Header.Get("If-None-Match")
+	if inm == "" {
+		return false
+	}
+	for _, tag := range strings.Split(inm, ",") {
+		tag = strings.TrimPrefix(strings.TrimSpace(tag), "W/")
+		if tag == "*" || tag == etag {
+			return true
+		}
+	}
+	return false
+}
+
+// writeJSONWithETag 以响应内容的哈希作为 ETag 输出 JSON，客户端缓存的 ETag 一致时只返回 304
+func writeJSONWithETag(w http.ResponseWriter, r *http.Request, data any) {
+	body, err := json.Marshal(data)
+	if err != nil {
+		writeJSON(w, map[string]any{"success": false, "message": err.Error()})
+		return
+	}
+	body = append(body, '\n')
+	sum := sha256.Sum256(body)
+	// gzipJSON 已决定压缩时，ETag 对应压缩后的表示形式
+	etag := strongETag(hex.EncodeToString(sum[:16]), w.Header().Get("Content-Encoding") == "gzip")
+	w.Header().Set("ETag", etag)
+	w.Header().Set("Cache-Control", "no-cache")
+	if etagMatches(r, etag) {
+		w.WriteHeader(http.StatusNotModified)
+		return
+	}
+	w.Header().Set("Content-Type", "application/json; charset=utf-8")
+	w.Header().Set("Access-Control-Allow-Origin", "*")
+	_, _ = w.Write(body)
+}
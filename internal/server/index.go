@@ -0,0 +1,289 @@
+package server
+
+import (
+	"encoding/base64"
+	"errors"
+	"net/http"
+	"path/filepath"
+	"sort"
+	"strconv"
+	"strings"
+	"sync"
+	"time"
+)
+
+// 分页列表每页的默认与最大条数
+const (
+	defaultPageSize = 50
+	maxPageSize     = 500
+)
+
+// errBadCursor 分页游标无法解析
+var errBadCursor = errors.New("无效的分页游标")
+
+// stampInfo 由文件状态生成列表项
+func stampInfo(name string, st fileStamp) FileInfo {
+	return FileInfo{
+		Name:     name,
+		Size:     st.size,
+		Modified: time.Unix(0, st.mtimeNs).Format("2006-01-02 15:04:05"),
+		MTimeNs:  st.mtimeNs,
+	}
+}
+
+func nameLess(a, b FileInfo) bool {
+	return a.Name < b.Name
+}
+
+func mtimeLess(a, b FileInfo) bool {
+	if a.MTimeNs != b.MTimeNs {
+		return a.MTimeNs < b.MTimeNs
+	}
+	return a.Name < b.Name
+}
+
+// fileIndex info 目录的内存索引：按文件名、按 (修改时间, 文件名) 各保存一份升序切片，
+// 由目录监视增量更新（二分查找后插入或删除），分页查询不再读目录也不再排序
+type fileIndex struct {
+	mu      sync.RWMutex
+	byName  []FileInfo
+	byMtime []FileInfo
+}
+
+func insertSorted(s []FileInfo, f FileInfo, less func(a, b FileInfo) bool) []FileInfo {
+	i := sort.Search(len(s), func(i int) bool { return !less(s[i], f) })
+	s = append(s, FileInfo{})
+	copy(s[i+1:], s[i:])
+	s[i] = f
+	return s
+}
+
+func removeSorted(s []FileInfo, f FileInfo, less func(a, b FileInfo) bool) []FileInfo {
+	i := sort.Search(len(s), func(i int) bool { return !less(s[i], f) })
+	if i < len(s) && s[i].Name == f.Name {
+		s = append(s[:i], s[i+1:]...)
+	}
+	return s
+}
+
+// reset 以一次完整扫描的结果重建索引
+func (x *fileIndex) reset(files map[string]fileStamp) {
+	byName := make([]FileInfo, 0, len(files))
+	for name, st := range files {
+		byName = append(byName, stampInfo(name, st))
+	}
+	byMtime := append([]FileInfo(nil), byName...)
+	sort.Slice(byName, func(i, j int) bool { return nameLess(byName[i], byName[j]) })
+	sort.Slice(byMtime, func(i, j int) bool { return mtimeLess(byMtime[i], byMtime[j]) })
+	x.mu.Lock()
+	x.byName, x.byMtime = byName, byMtime
+	x.mu.Unlock()
+}
+
+// lookup 按文件名查找（调用方持有锁）
+func (x *fileIndex) lookup(name string) (FileInfo, bool) {
+	i := sort.Search(len(x.byName), func(i int) bool { return x.byName[i].Name >= name })
+	if i < len(x.byName) && x.byName[i].Name == name {
+		return x.byName[i], true
+	}
+	return FileInfo{}, false
+}
+
+// put 新增或更新一个文件
+func (x *fileIndex) put(f FileInfo) {
+	x.mu.Lock()
+	defer x.mu.Unlock()
+	if old, ok := x.lookup(f.Name); ok {
+		x.byName = removeSorted(x.byName, old, nameLess)
+		x.byMtime = removeSorted(x.byMtime, old, mtimeLess)
+	}
+	x.byName = insertSorted(x.byName, f, nameLess)
+	x.byMtime = insertSorted(x.byMtime, f, mtimeLess)
+}
+
+// remove 删除一个文件
+func (x *fileIndex) remove(name string) {
+	x.mu.Lock()
+	defer x.mu.Unlock()
+	if old, ok := x.lookup(name); ok {
+		x.byName = removeSorted(x.byName, old, nameLess)
+		x.byMtime = removeSorted(x.byMtime, old, mtimeLess)
+	}
+}
+
+// all 返回按文件名排序的全部文件（副本）
+func (x *fileIndex) all() []FileInfo {
+	x.mu.RLock()
+	defer x.mu.RUnlock()
+	return append([]FileInfo(nil), x.byName...)
+}
+
+// listQuery 分页查询条件
+type listQuery struct {
+	// exts 小写、带点的扩展名，为空时不过滤
+	exts map[string]bool
+	// prefix 小写的文件名前缀（不区分大小写，与 Windows 文件名一致）
+	prefix  string
+	byMtime bool
+	desc    bool
+	// after 上一页最后一项，为空时从头开始
+	after *FileInfo
+	limit int
+}
+
+func (q *listQuery) match(f FileInfo) bool {
+	if len(q.exts) > 0 && !q.exts[strings.ToLower(filepath.Ext(f.Name))] {
+		return false
+	}
+	return q.prefix == "" || strings.HasPrefix(strings.ToLower(f.Name), q.prefix)
+}
+
+// query 返回游标之后的一页、符合条件的总数，以及之后是否还有符合条件的文件
+func (x *fileIndex) query(q listQuery) (page []FileInfo, total int, more bool) {
+	x.mu.RLock()
+	defer x.mu.RUnlock()
+	s, less := x.byName, nameLess
+	if q.byMtime {
+		s, less = x.byMtime, mtimeLess
+	}
+
+	// 游标按排序键定位（二分查找），游标对应的文件已删除也能继续翻页
+	start, step := 0, 1
+	if q.desc {
+		start, step = len(s)-1, -1
+	}
+	if q.after != nil {
+		c := *q.after
+		if q.desc {
+			start = sort.Search(len(s), func(i int) bool { return !less(s[i], c) }) - 1
+		} else {
+			start = sort.Search(len(s), func(i int) bool { return less(c, s[i]) })
+		}
+	}
+
+	for _, f := range s {
+		if q.match(f) {
+			total++
+		}
+	}
+	for i := start; i >= 0 && i < len(s); i += step {
+		if !q.match(s[i]) {
+			continue
+		}
+		if len(page) == q.limit {
+			return page, total, true
+		}
+		page = append(page, s[i])
+	}
+	return page, total, false
+}
+
+// encodeCursor 游标为最后一项的排序键：修改时间与文件名
+func encodeCursor(f FileInfo) string {
+	return base64.RawURLEncoding.EncodeToString([]byte(strconv.FormatInt(f.MTimeNs, 10) + "/" + f.Name))
+}
+
+func decodeCursor(raw string) (*FileInfo, error) {
+	data, err := base64.RawURLEncoding.DecodeString(raw)
+	if err != nil {
+		return nil, errBadCursor
+	}
+	mtime, name, ok := strings.Cut(string(data), "/")
+	ns, err := strconv.ParseInt(mtime, 10, 64)
+	if !ok || err != nil || name == "" {
+		return nil, errBadCursor
+	}
+	return &FileInfo{Name: name, MTimeNs: ns}, nil
+}
+
+// pageParams 分页列表的查询参数，出现任意一个即按分页返回
+var pageParams = []string{"cursor", "limit", "ext", "prefix", "sort", "order"}
+
+func isPageRequest(r *http.Request) bool {
+	query := r.URL.Query()
+	for _, p := range pageParams {
+		if query.Has(p) {
+			return true
+		}
+	}
+	return false
+}
+
+// parseListQuery 解析 ?cursor=&limit=&ext=.png,.jpg&prefix=&sort=name|mtime&order=asc|desc；
+// 默认按文件名升序，按修改时间排序时默认新的在前
+func parseListQuery(r *http.Request) (listQuery, error) {
+	query := r.URL.Query()
+	q := listQuery{limit: defaultPageSize, prefix: strings.ToLower(query.Get("prefix"))}
+	if raw := query.Get("limit"); raw != "" {
+		n, err := strconv.Atoi(raw)
+		if err != nil || n <= 0 {
+			return q, errors.New("无效的 limit")
+		}
+		q.limit = min(n, maxPageSize)
+	}
+	for _, ext := range strings.Split(query.Get("ext"), ",") {
+		ext = strings.ToLower(strings.TrimSpace(ext))
+		if ext == "" {
+			continue
+		}
+		if !strings.HasPrefix(ext, ".") {
+			ext = "." + ext
+		}
+		if q.exts == nil {
+			q.exts = make(map[string]bool)
+		}
+		q.exts[ext] = true
+	}
+	switch query.Get("sort") {
+	case "", "name":
+	case "mtime":
+		q.byMtime, q.desc = true, true
+	default:
+		return q, errors.New("sort 只能为 name 或 mtime")
+	}
+	switch query.Get("order") {
+	case "":
+	case "asc":
+		q.desc = false
+	case "desc":
+		q.desc = true
+	default:
+		return q, errors.New("order 只能为 asc 或 desc")
+	}
+	if raw := query.Get("cursor"); raw != "" {
+		after, err := decodeCursor(raw)
+		if err != nil {
+			return q, err
+		}
+		q.after = after
+	}
+	return q, nil
+}
+
+// listPage 分页列表：从内存索引中取一页，附带内容哈希（只为本页文件计算，按 mtime/大小缓存），
+// next_cursor 为空表示已是最后一页
+func (s *InfoServer) listPage(w http.ResponseWriter, r *http.Request) {
+	q, err := parseListQuery(r)
+	if err != nil {
+		writeJSONStatus(w, http.StatusBadRequest, map[string]any{"success": false, "message": err.Error()})
+		return
+	}
+	page, total, more := s.watch.index.query(q)
+	for i := range page {
+		page[i].Hash, _ = s.hashes.get(filepath.Join(s.InfoFolder, page[i].Name), page[i].Size, page[i].MTimeNs)
+	}
+	next := ""
+	if more {
+		next = encodeCursor(page[len(page)-1])
+	}
+	if page == nil {
+		page = []FileInfo{}
+	}
+	writeJSONWithETag(w, r, map[string]any{
+		"success":     true,
+		"files":       page,
+		"total":       total,
+		"next_cursor": next,
+		"version":     s.watch.current(),
+	})
+}
@@ -0,0 +1,103 @@
+package server
+
+import (
+	"crypto/sha256"
+	"encoding/hex"
+	"io"
+	"net/http"
+	"os"
+	"path/filepath"
+	"sync"
+)
+
+// hashEntry 缓存的文件内容哈希及其对应的文件状态
+type hashEntry struct {
+	size    int64
+	mtimeNs int64
+	hash    string
+}
+
+// hashCache 文件内容哈希缓存，仅在文件 mtime/大小变化时重新计算
+type hashCache struct {
+	mu      sync.Mutex
+	entries map[string]hashEntry
+}
+
+func newHashCache() *hashCache {
+	return &hashCache{entries: make(map[string]hashEntry)}
+}
+
+// get 返回文件的 SHA-256（十六进制），文件未变化时直接使用缓存
+func (c *hashCache) get(path string, size, mtimeNs int64) (string, error) {
+	c.mu.Lock()
+	e, ok := c.entries[path]
+	c.mu.Unlock()
+	if ok && e.size == size && e.mtimeNs == mtimeNs {
+		return e.hash, nil
+	}
+
+	sum, err := fileSHA256(path)
+	if err != nil {
+		return "", err
+	}
+	c.mu.Lock()
+	c.entries[path] = hashEntry{size: size, mtimeNs: mtimeNs, hash: sum}
+	c.mu.Unlock()
+	return sum, nil
+}
+
+// prune 删除已不存在文件的缓存项
+func (c *hashCache) prune(alive map[string]bool) {
+	c.mu.Lock()
+	for p := range c.entries {
+		if !alive[p] {
+			delete(c.entries, p)
+		}
+	}
+	c.mu.Unlock()
+}
+
+func fileSHA256(path string) (string, error) {
+	f, err := os.Open(path)
+	if err != nil {
+		return "", err
+	}
+	defer f.Close()
+	h := sha256.New()
+	if _, err := io.Copy(h, f); err != nil {
+		return "", err
+	}
+	return hex.EncodeToString(h.Sum(nil)), nil
+}
+
+// manifestFiles 返回带内容哈希的文件列表
+func (s *InfoServer) manifestFiles() []FileInfo {
+	files := s.readFiles()
+	alive := make(map[string]bool, len(files))
+	out := files[:0]
+	for _, f := range files {
+		path := filepath.Join(s.InfoFolder, f.Name)
+		sum, err := s.hashes.get(path, f.Size, f.MTimeNs)
+		if err != nil {
+			continue
+		}
+		f.Hash = sum
+		alive[path] = true
+		out = append(out, f)
+	}
+	s.hashes.prune(alive)
+	s.content.prune(alive)
+	return out
+}
+
+// handleManifest 一次返回状态信息与全部文件的大小、修改时间和内容哈希，
+// 客户端据此判断需要下载哪些文件，取代 status + files 两次请求
+func (s *InfoServer) handleManifest(w http.ResponseWriter, r *http.Request) {
+	files := s.manifestFiles()
+	writeJSONWithETag(w, r, map[string]any{
+		"success":     true,
+		"port":        s.Port,
+		"files_count": len(files),
+		"files":       files,
+	})
+}
@@ -0,0 +1,232 @@
+package server
+
+import (
+	"fmt"
+	"io"
+	"net/http"
+	"strconv"
+	"strings"
+	"sync/atomic"
+	"time"
+)
+
+// 请求耗时直方图的桶上限（秒）
+var latencyBuckets = []float64{0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10}
+
+// 上传大小直方图的桶上限（字节）
+var uploadBuckets = []float64{1 << 10, 16 << 10, 256 << 10, 1 << 20, 8 << 20, 32 << 20, 128 << 20}
+
+// histogram 无锁直方图：各桶独立原子计数（非累积，导出时再累加），
+// 总和以整数单位累加，导出时乘以 scale
+type histogram struct {
+	bounds []float64
+	scale  float64
+	counts []atomic.Uint64
+	sum    atomic.Uint64
+}
+
+func newHistogram(bounds []float64, scale float64) *histogram {
+	return &histogram{bounds: bounds, scale: scale, counts: make([]atomic.Uint64, len(bounds)+1)}
+}
+
+// observe 记录一个以整数单位表示的观测值
+func (h *histogram) observe(units uint64) {
+	v := float64(units) * h.scale
+	i := 0
+	for i < len(h.bounds) && v > h.bounds[i] {
+		i++
+	}
+	h.counts[i].Add(1)
+	h.sum.Add(units)
+}
+
+// write 按 Prometheus 文本格式输出，labels 形如 `route="/api/files",`
+func (h *histogram) write(b *strings.Builder, name, labels string) {
+	var cum uint64
+	for i, bound := range h.bounds {
+		cum += h.counts[i].Load()
+		fmt.Fprintf(b, "%s_bucket{%sle=\"%s\"} %d\n", name, labels, strconv.FormatFloat(bound, 'g', -1, 64), cum)
+	}
+	cum += h.counts[len(h.bounds)].Load()
+	fmt.Fprintf(b, "%s_bucket{%sle=\"+Inf\"} %d\n", name, labels, cum)
+	if labels != "" {
+		labels = "{" + strings.TrimSuffix(labels, ",") + "}"
+	}
+	fmt.Fprintf(b, "%s_sum%s %s\n", name, labels, strconv.FormatFloat(float64(h.sum.Load())*h.scale, 'g', -1, 64))
+	fmt.Fprintf(b, "%s_count%s %d\n", name, labels, cum)
+}
+
+// routeMetrics 单个路由的统计
+type routeMetrics struct {
+	latency *histogram
+	// 按状态码类别计数：下标 1..5 对应 1xx..5xx
+	codes [6]atomic.Uint64
+	bytes atomic.Uint64
+}
+
+// serverMetrics 服务器统计；路由表在注册时建好，之后只读，采集路径上只有原子操作
+type serverMetrics struct {
+	routes   map[string]*routeMetrics
+	order    []string
+	inFlight atomic.Int64
+	uploads  *histogram
+}
+
+func newServerMetrics() *serverMetrics {
+	return &serverMetrics{
+		routes:  make(map[string]*routeMetrics),
+		uploads: newHistogram(uploadBuckets, 1),
+	}
+}
+
+// metricsWriter 记录状态码与发送字节数；实现 ReadFrom 以保留 sendfile 路径
+type metricsWriter struct {
+	http.ResponseWriter
+	code  int
+	bytes uint64
+}
+
+func (m *metricsWriter) WriteHeader(code int) {
+	if m.code == 0 {
+		m.code = code
+	}
+	m.ResponseWriter.WriteHeader(code)
+}
+
+func (m *metricsWriter) Write(b []byte) (int, error) {
+	if m.code == 0 {
+		m.code = http.StatusOK
+	}
+	n, err := m.ResponseWriter.Write(b)
+	m.bytes += uint64(n)
+	return n, err
+}
+
+func (m *metricsWriter) ReadFrom(r io.Reader) (int64, error) {
+	if m.code == 0 {
+		m.code = http.StatusOK
+	}
+	n, err := io.Copy(m.ResponseWriter, r)
+	m.bytes += uint64(n)
+	return n, err
+}
+
+// Unwrap 供 http.ResponseController 访问底层连接（Flush 等）
+func (m *metricsWriter) Unwrap() http.ResponseWriter {
+	return m.ResponseWriter
+}
+
+// observe 包装路由处理器，统计请求数、耗时、发送字节数与进行中的请求数
+func (sm *serverMetrics) observe(route string, next http.HandlerFunc) http.HandlerFunc {
+	rm := &routeMetrics{latency: newHistogram(latencyBuckets, 1e-9)}
+	sm.routes[route] = rm
+	sm.order = append(sm.order, route)
+	return func(w http.ResponseWriter, r *http.Request) {
+		sm.inFlight.Add(1)
+		start := time.Now()
+		mw := &metricsWriter{ResponseWriter: w}
+		defer func() {
+			rm.latency.observe(uint64(time.Since(start)))
+			code := mw.code
+			if code == 0 {
+				code = http.StatusOK
+			}
+			if c := code / 100; c >= 1 && c <= 5 {
+				rm.codes[c].Add(1)
+			}
+			rm.bytes.Add(mw.bytes)
+			sm.inFlight.Add(-1)
+		}()
+		next(mw, r)
+	}
+}
+
+// requestsTotal 各路由已完成的请求数之和（/metrics 本身不计入）
+func (sm *serverMetrics) requestsTotal() uint64 {
+	var sum uint64
+	for _, rm := range sm.routes {
+		for c := 1; c <= 5; c++ {
+			sum += rm.codes[c].Load()
+		}
+	}
+	return sum
+}
+
+// handleMetrics 以 Prometheus 文本格式输出统计
+func (s *InfoServer) handleMetrics(w http.ResponseWriter, r *http.Request) {
+	sm := s.metrics
+	var b strings.Builder
+
+	b.WriteString("# HELP netconf_http_requests_total 按路由与状态码类别统计的请求数\n")
+	b.WriteString("# TYPE netconf_http_requests_total counter\n")
+	for _, route := range sm.order {
+		rm := sm.routes[route]
+		for c := 1; c <= 5; c++ {
+			if n := rm.codes[c].Load(); n > 0 {
+				fmt.Fprintf(&b, "netconf_http_requests_total{route=%q,code=\"%dxx\"} %d\n", route, c, n)
+			}
+		}
+	}
+
+	b.WriteString("# HELP netconf_http_request_duration_seconds 按路由统计的请求耗时\n")
+	b.WriteString("# TYPE netconf_http_request_duration_seconds histogram\n")
+	for _, route := range sm.order {
+		sm.routes[route].latency.write(&b, "netconf_http_request_duration_seconds", fmt.Sprintf("route=%q,", route))
+	}
+
+	b.WriteString("# HELP netconf_http_response_bytes_total 按路由统计的响应体发送字节数\n")
+	b.WriteString("# TYPE netconf_http_response_bytes_total counter\n")
+	for _, route := range sm.order {
+		fmt.Fprintf(&b, "netconf_http_response_bytes_total{route=%q} %d\n", route, sm.routes[route].bytes.Load())
+	}
+
+	b.WriteString("# HELP netconf_http_requests_in_flight 正在处理的请求数\n")
+	b.WriteString("# TYPE netconf_http_requests_in_flight gauge\n")
+	fmt.Fprintf(&b, "netconf_http_requests_in_flight %d\n", sm.inFlight.Load())
+
+	b.WriteString("# HELP netconf_http_rejected_total 因限流（rate_limit，429）或过载（overload，503）被拒绝的请求数\n")
+	b.WriteString("# TYPE netconf_http_rejected_total counter\n")
+	fmt.Fprintf(&b, "netconf_http_rejected_total{reason=\"rate_limit\"} %d\n", s.limits.limited.Load())
+	fmt.Fprintf(&b, "netconf_http_rejected_total{reason=\"overload\"} %d\n", s.limits.shed.Load())
+
+	b.WriteString("# HELP netconf_upload_size_bytes 上传文件大小\n")
+	b.WriteString("# TYPE netconf_upload_size_bytes histogram\n")
+	sm.uploads.write(&b, "netconf_upload_size_bytes", "")
+
+	st := s.cacheStats()
+	caches := []struct {
+		name         string
+		hits, misses uint64
+	}{
+		{"content", st["hits"].(uint64), st["misses"].(uint64)},
+		{"listing", st["listing_hits"].(uint64), st["listing_misses"].(uint64)},
+	}
+	b.WriteString("# HELP netconf_cache_hits_total 缓存命中次数\n")
+	b.WriteString("# TYPE netconf_cache_hits_total counter\n")
+	for _, c := range caches {
+		fmt.Fprintf(&b, "netconf_cache_hits_total{cache=%q} %d\n", c.name, c.hits)
+	}
+	b.WriteString("# HELP netconf_cache_misses_total 缓存未命中次数\n")
+	b.WriteString("# TYPE netconf_cache_misses_total counter\n")
+	for _, c := range caches {
+		fmt.Fprintf(&b, "netconf_cache_misses_total{cache=%q} %d\n", c.name, c.misses)
+	}
+	b.WriteString("# HELP netconf_cache_hit_ratio 缓存命中率\n")
+	b.WriteString("# TYPE netconf_cache_hit_ratio gauge\n")
+	for _, c := range caches {
+		ratio := 0.0
+		if c.hits+c.misses > 0 {
+			ratio = float64(c.hits) / float64(c.hits+c.misses)
+		}
+		fmt.Fprintf(&b, "netconf_cache_hit_ratio{cache=%q} %s\n", c.name, strconv.FormatFloat(ratio, 'g', 4, 64))
+	}
+	b.WriteString("# HELP netconf_cache_evictions_total 内容缓存淘汰次数\n")
+	b.WriteString("# TYPE netconf_cache_evictions_total counter\n")
+	fmt.Fprintf(&b, "netconf_cache_evictions_total{cache=\"content\"} %d\n", st["evictions"].(uint64))
+	b.WriteString("# HELP netconf_cache_bytes 内容缓存占用字节数\n")
+	b.WriteString("# TYPE netconf_cache_bytes gauge\n")
+	fmt.Fprintf(&b, "netconf_cache_bytes{cache=\"content\"} %d\n", st["bytes"].(int64))
+
+	w.Header().Set("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+	_, _ = io.WriteString(w, b.String())
+}
@@ -0,0 +1,166 @@
+package server
+
+import (
+	"fmt"
+	"math"
+	"net"
+	"net/http"
+	"os"
+	"strconv"
+	"sync"
+	"sync/atomic"
+	"time"
+)
+
+// 限流：每个客户端 IP 在每个路由上一个令牌桶，令牌用完时返回 429 与 Retry-After；
+// 同时处理的请求数超过上限时直接返回 503（变化通知长连接不计入），
+// 个别客户端反复刷新时只有它自己被拒绝，不会拖慢其他客户端
+const (
+	// envRateLimit 各路由默认速率的倍数，0 关闭限流（压测时使用）
+	envRateLimit = "NETCONF_RATE_LIMIT"
+	// envMaxInFlight 同时处理的请求数上限，0 不限制
+	envMaxInFlight     = "NETCONF_MAX_INFLIGHT"
+	defaultMaxInFlight = 512
+	// bucketIdleTTL 超过该时间未使用的令牌桶（早已回满）被清理
+	bucketIdleTTL = time.Minute
+	// overloadRetryAfter 过载时建议客户端等待的秒数
+	overloadRetryAfter = 1
+)
+
+// routeRate 路由的令牌补充速率（次/秒）与桶容量（允许的突发请求数）
+type routeRate struct {
+	rate  float64
+	burst float64
+}
+
+// defaultRouteRates 每个客户端 IP 的默认限额；一次翻页约 2 个列表请求加 12 个下载，
+// 医院内多台电脑经同一出口 IP 访问时也留有余量。/api/changes 包括每次同步前读取版本号的普通请求
+// 与每台电脑一条的通知长连接（断线后重连），同一出口 IP 后的几十台电脑同时启动时不应被拒绝。/metrics 不限流
+var defaultRouteRates = map[string]routeRate{
+	"/api/files":    {10, 20},
+	"/api/status":   {10, 20},
+	"/api/manifest": {10, 20},
+	"/api/changes":  {5, 50},
+	"/api/bundle":   {1, 5},
+	"/download/":    {50, 200},
+	"/api/upload":   {2, 10},
+	"/api/save":     {2, 10},
+	"/api/patch":    {2, 10},
+}
+
+type bucketKey struct {
+	ip    string
+	route string
+}
+
+type bucket struct {
+	tokens float64
+	last   time.Time
+}
+
+// rateLimiter 令牌桶限流与过载保护
+type rateLimiter struct {
+	rates       map[string]routeRate
+	maxInFlight int64
+	inFlight    atomic.Int64
+
+	mu        sync.Mutex
+	buckets   map[bucketKey]*bucket
+	lastSweep time.Time
+
+	// 被拒绝的请求数，导出到 /metrics
+	limited atomic.Uint64
+	shed    atomic.Uint64
+}
+
+// newRateLimiter 按 NETCONF_RATE_LIMIT 与 NETCONF_MAX_INFLIGHT 创建限流器
+func newRateLimiter() *rateLimiter {
+	l := &rateLimiter{
+		maxInFlight: defaultMaxInFlight,
+		buckets:     make(map[bucketKey]*bucket),
+		lastSweep:   time.Now(),
+	}
+	scale := 1.0
+	if f, err := strconv.ParseFloat(os.Getenv(envRateLimit), 64); err == nil && f >= 0 {
+		scale = f
+	}
+	if scale > 0 {
+		l.rates = make(map[string]routeRate, len(defaultRouteRates))
+		for route, rr := range defaultRouteRates {
+			l.rates[route] = routeRate{rate: rr.rate * scale, burst: math.Max(1, rr.burst*scale)}
+		}
+	}
+	if n, err := strconv.ParseInt(os.Getenv(envMaxInFlight), 10, 64); err == nil && n >= 0 {
+		l.maxInFlight = n
+	}
+	return l
+}
+
+// allow 从客户端在该路由上的令牌桶中取一个令牌；不足时返回还需等待的时间
+func (l *rateLimiter) allow(ip, route string, rr routeRate, now time.Time) (bool, time.Duration) {
+	l.mu.Lock()
+	defer l.mu.Unlock()
+	if now.Sub(l.lastSweep) > bucketIdleTTL {
+		for k, b := range l.buckets {
+			if now.Sub(b.last) > bucketIdleTTL {
+				delete(l.buckets, k)
+			}
+		}
+		l.lastSweep = now
+	}
+	key := bucketKey{ip: ip, route: route}
+	b, ok := l.buckets[key]
+	if !ok {
+		b = &bucket{tokens: rr.burst, last: now}
+		l.buckets[key] = b
+	}
+	b.tokens = math.Min(rr.burst, b.tokens+now.Sub(b.last).Seconds()*rr.rate)
+	b.last = now
+	if b.tokens >= 1 {
+		b.tokens--
+		return true, 0
+	}
+	return false, time.Duration((1 - b.tokens) / rr.rate * float64(time.Second))
+}
+
+// clientIP 取连接的对端地址（服务器直接面向客户端，不信任 X-Forwarded-For）
+func clientIP(r *http.Request) string {
+	host, _, err := net.SplitHostPort(r.RemoteAddr)
+	if err != nil {
+		return r.RemoteAddr
+	}
+	return host
+}
+
+// wrap 为路由加上限流与过载保护；被拒绝的请求不进入后续处理（包括认证）
+func (l *rateLimiter) wrap(route string, next http.HandlerFunc) http.HandlerFunc {
+	rr, limited := l.rates[route]
+	tracked := l.maxInFlight > 0 && route != "/api/changes"
+	return func(w http.ResponseWriter, r *http.Request) {
+		if limited {
+			if ok, wait := l.allow(clientIP(r), route, rr, time.Now()); !ok {
+				l.limited.Add(1)
+				w.Header().Set("Retry-After", strconv.Itoa(int(math.Ceil(wait.Seconds()))))
+				writeJSONStatus(w, http.StatusTooManyRequests, map[string]any{
+					"success": false,
+					"message": "请求过于频繁，请稍后重试",
+				})
+				return
+			}
+		}
+		if tracked {
+			n := l.inFlight.Add(1)
+			defer l.inFlight.Add(-1)
+			if n > l.maxInFlight {
+				l.shed.Add(1)
+				w.Header().Set("Retry-After", strconv.Itoa(overloadRetryAfter))
+				writeJSONStatus(w, http.StatusServiceUnavailable, map[string]any{
+					"success": false,
+					"message": fmt.Sprintf("服务器繁忙（同时处理的请求已达 %d），请稍后重试", l.maxInFlight),
+				})
+				return
+			}
+		}
+		next(w, r)
+	}
+}
@@ -0,0 +1,176 @@
+package server
+
+import (
+	"bytes"
+	"crypto/sha256"
+	"encoding/hex"
+	"encoding/json"
+	"errors"
+	"fmt"
+	"net/http"
+	"os"
+	"path/filepath"
+	"strings"
+)
+
+// patchHunk 基于行的修改：从基础版本第 Start 行（从 0 开始）起删除 Delete 行，再插入 Insert；
+// 行只按 \n 切分，内容包含各自的换行符
+type patchHunk struct {
+	Start  int      `json:"start"`
+	Delete int      `json:"delete"`
+	Insert []string `json:"insert"`
+}
+
+// errPatchMismatch 补丁的行号超出基础版本或相互重叠
+var errPatchMismatch = errors.New("补丁与基础版本不匹配")
+
+// splitLines 按行切分并保留换行符
+func splitLines(data []byte) []string {
+	lines := strings.SplitAfter(string(data), "\n")
+	if lines[len(lines)-1] == "" {
+		lines = lines[:len(lines)-1]
+	}
+	return lines
+}
+
+// applyPatch 将按起始行升序排列、互不重叠的修改应用到基础版本
+func applyPatch(base []byte, hunks []patchHunk) ([]byte, error) {
+	lines := splitLines(base)
+	var out bytes.Buffer
+	out.Grow(len(base))
+	pos := 0
+	for _, h := range hunks {
+		if h.Start < pos || h.Delete < 0 || h.Start+h.Delete > len(lines) {
+			return nil, errPatchMismatch
+		}
+		for _, l := range lines[pos:h.Start] {
+			out.WriteString(l)
+		}
+		for _, l := range h.Insert {
+			out.WriteString(l)
+		}
+		pos = h.Start + h.Delete
+	}
+	for _, l := range lines[pos:] {
+		out.WriteString(l)
+	}
+	return out.Bytes(), nil
+}
+
+func sha256Hex(data []byte) string {
+	sum := sha256.Sum256(data)
+	return hex.EncodeToString(sum[:])
+}
+
+// currentContent 读取文件当前内容；文件不存在时返回 nil, nil
+func (s *InfoServer) currentContent(path string) ([]byte, error) {
+	data, err := os.ReadFile(path)
+	if errors.Is(err, os.ErrNotExist) {
+		return nil, nil
+	}
+	return data, err
+}
+
+// writeConflict 基础版本与服务器当前内容不一致
+func writeConflict(w http.ResponseWriter, current []byte) {
+	writeJSONStatus(w, http.StatusConflict, map[string]any{
+		"success":  false,
+		"conflict": true,
+		"message":  "文件已被其他人修改，请重新加载后再保存",
+		"hash":     sha256Hex(current),
+	})
+}
+
+// saveName 校验并返回请求中的文件名
+func saveName(filename string) (string, bool) {
+	name := filepath.Base(filename)
+	return name, filename != "" && name != "." && name != string(filepath.Separator)
+}
+
+// handleSave 整体保存：写入临时文件后原子替换；提供 base_hash 时与当前内容不一致则返回 409
+func (s *InfoServer) handleSave(w http.ResponseWriter, r *http.Request) {
+	var body struct {
+		Filename string `json:"filename"`
+		Content  string `json:"content"`
+		BaseHash string `json:"base_hash"`
+	}
+	r.Body = http.MaxBytesReader(w, r.Body, s.MaxUploadBytes)
+	if err := json.NewDecoder(r.Body).Decode(&body); err != nil {
+		writeJSON(w, map[string]any{"success": false, "message": err.Error()})
+		return
+	}
+	name, ok := saveName(body.Filename)
+	if !ok {
+		writeJSON(w, map[string]any{"success": false, "message": "文件名不能为空"})
+		return
+	}
+
+	s.saveMu.Lock()
+	defer s.saveMu.Unlock()
+	if body.BaseHash != "" {
+		current, err := s.currentContent(filepath.Join(s.InfoFolder, name))
+		if err != nil {
+			writeJSON(w, map[string]any{"success": false, "message": err.Error()})
+			return
+		}
+		if current == nil || sha256Hex(current) != body.BaseHash {
+			writeConflict(w, current)
+			return
+		}
+	}
+	content := []byte(body.Content)
+	if _, err := s.writeFileAtomic(name, bytes.NewReader(content)); err != nil {
+		writeJSON(w, map[string]any{"success": false, "message": err.Error()})
+		return
+	}
+	writeJSON(w, map[string]any{"success": true, "message": "保存成功: " + name, "hash": sha256Hex(content)})
+}
+
+// handlePatch 增量保存：请求只携带基于 base_hash 版本的行修改，
+// 基础版本与当前内容不一致时返回 409，否则应用补丁后原子替换文件
+func (s *InfoServer) handlePatch(w http.ResponseWriter, r *http.Request) {
+	var body struct {
+		Filename string      `json:"filename"`
+		BaseHash string      `json:"base_hash"`
+		Patch    []patchHunk `json:"patch"`
+	}
+	r.Body = http.MaxBytesReader(w, r.Body, s.MaxUploadBytes)
+	if err := json.NewDecoder(r.Body).Decode(&body); err != nil {
+		writeJSON(w, map[string]any{"success": false, "message": err.Error()})
+		return
+	}
+	name, ok := saveName(body.Filename)
+	if !ok || body.BaseHash == "" {
+		writeJSON(w, map[string]any{"success": false, "message": "文件名与 base_hash 不能为空"})
+		return
+	}
+
+	s.saveMu.Lock()
+	defer s.saveMu.Unlock()
+	current, err := s.currentContent(filepath.Join(s.InfoFolder, name))
+	if err != nil {
+		writeJSON(w, map[string]any{"success": false, "message": err.Error()})
+		return
+	}
+	if current == nil || sha256Hex(current) != body.BaseHash {
+		writeConflict(w, current)
+		return
+	}
+	content, err := applyPatch(current, body.Patch)
+	if err != nil {
+		writeJSONStatus(w, http.StatusUnprocessableEntity, map[string]any{"success": false, "message": err.Error()})
+		return
+	}
+	if int64(len(content)) > s.MaxUploadBytes {
+		writeJSONStatus(w, http.StatusRequestEntityTooLarge, map[string]any{
+			"success": false,
+			"message": fmt.Sprintf("文件过大，上限 %d MB", s.MaxUploadBytes>>20),
+		})
+		return
+	}
+	if _, err := s.writeFileAtomic(name, bytes.NewReader(content)); err != nil {
+		writeJSON(w, map[string]any{"success": false, "message": err.Error()})
+		return
+	}
+	writeJSON(w, map[string]any{"success": true, "message": "保存成功: " + name, "hash": sha256Hex(content)})
+}
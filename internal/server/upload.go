@@ -0,0 +1,136 @@
+package server
+
+import (
+	"encoding/json"
+	"errors"
+	"fmt"
+	"io"
+	"net/http"
+	"os"
+	"path/filepath"
+	"strconv"
+)
+
+// 上传大小上限：NETCONF_MAX_UPLOAD_MB 未设置或无效时为 100MB
+const (
+	envMaxUploadMB       = "NETCONF_MAX_UPLOAD_MB"
+	defaultMaxUploadSize = 100 << 20
+)
+
+// partialDir info 目录下存放上传中临时文件的子目录（目录不会出现在文件列表中，也无法被下载）
+const partialDir = ".partial"
+
+// uploadBufferSize 上传时每次拷贝的块大小，内存占用与上传文件大小无关
+const uploadBufferSize = 64 << 10
+
+// errTooLarge 上传内容超过大小上限
+var errTooLarge = errors.New("文件过大")
+
+// maxReader 读取超过 left 字节时返回 errTooLarge，使写入在改名前中止
+type maxReader struct {
+	r    io.Reader
+	left int64
+}
+
+func (m *maxReader) Read(p []byte) (int, error) {
+	n, err := m.r.Read(p)
+	m.left -= int64(n)
+	if m.left < 0 {
+		return n, errTooLarge
+	}
+	return n, err
+}
+
+func maxUploadBytes() int64 {
+	if mb, err := strconv.ParseInt(os.Getenv(envMaxUploadMB), 10, 64); err == nil && mb > 0 {
+		return mb << 20
+	}
+	return defaultMaxUploadSize
+}
+
+// writeJSONStatus 以指定状态码输出 JSON
+func writeJSONStatus(w http.ResponseWriter, code int, data any) {
+	w.Header().Set("Content-Type", "application/json; charset=utf-8")
+	w.Header().Set("Access-Control-Allow-Origin", "*")
+	w.WriteHeader(code)
+	_ = json.NewEncoder(w).Encode(data)
+}
+
+// writeFileAtomic 将 src 分块写入 info 目录下的临时文件，成功后改名为 name，
+// 失败时删除临时文件，已有的同名文件保持不变；返回写入的字节数
+func (s *InfoServer) writeFileAtomic(name string, src io.Reader) (int64, error) {
+	tmpDir := filepath.Join(s.InfoFolder, partialDir)
+	if err := os.MkdirAll(tmpDir, 0o755); err != nil {
+		return 0, err
+	}
+	tmp, err := os.CreateTemp(tmpDir, name+".*")
+	if err != nil {
+		return 0, err
+	}
+	n, err := io.CopyBuffer(tmp, src, make([]byte, uploadBufferSize))
+	if cerr := tmp.Close(); err == nil {
+		err = cerr
+	}
+	if err == nil {
+		err = os.Rename(tmp.Name(), filepath.Join(s.InfoFolder, name))
+	}
+	if err != nil {
+		_ = os.Remove(tmp.Name())
+		return n, err
+	}
+	s.listing.invalidate()
+	s.watch.touch(name)
+	return n, nil
+}
+
+// handleUpload 流式接收 multipart 上传：不解析整个表单，文件部分按块写入临时文件后原子改名，
+// Content-Length 超过上限时直接拒绝，分块传输的请求在读取中超限时中止
+func (s *InfoServer) handleUpload(w http.ResponseWriter, r *http.Request) {
+	tooLarge := map[string]any{
+		"success": false,
+		"message": fmt.Sprintf("文件过大，上限 %d MB", s.MaxUploadBytes>>20),
+	}
+	if r.ContentLength > s.MaxUploadBytes {
+		writeJSONStatus(w, http.StatusRequestEntityTooLarge, tooLarge)
+		return
+	}
+	// multipart 边界与表单头也计入请求体，额外留 1MB
+	r.Body = http.MaxBytesReader(w, r.Body, s.MaxUploadBytes+1<<20)
+	mr, err := r.MultipartReader()
+	if err != nil {
+		writeJSON(w, map[string]any{"success": false, "message": "解析失败: " + err.Error()})
+		return
+	}
+	for {
+		part, err := mr.NextPart()
+		if err != nil {
+			var maxErr *http.MaxBytesError
+			if errors.As(err, &maxErr) {
+				writeJSONStatus(w, http.StatusRequestEntityTooLarge, tooLarge)
+				return
+			}
+			writeJSON(w, map[string]any{"success": false, "message": "未找到文件字段"})
+			return
+		}
+		if part.FormName() != "file" || part.FileName() == "" {
+			part.Close()
+			continue
+		}
+
+		name := filepath.Base(part.FileName())
+		n, err := s.writeFileAtomic(name, &maxReader{r: part, left: s.MaxUploadBytes})
+		part.Close()
+		var maxErr *http.MaxBytesError
+		if errors.Is(err, errTooLarge) || errors.As(err, &maxErr) {
+			writeJSONStatus(w, http.StatusRequestEntityTooLarge, tooLarge)
+			return
+		}
+		if err != nil {
+			writeJSON(w, map[string]any{"success": false, "message": err.Error()})
+			return
+		}
+		s.metrics.uploads.observe(uint64(n))
+		writeJSON(w, map[string]any{"success": true, "message": "上传成功: " + name})
+		return
+	}
+}
@@ -0,0 +1,195 @@
+package server
+
+import (
+	"bytes"
+	"fmt"
+	"image"
+	"image/draw"
+	_ "image/gif"
+	"image/jpeg"
+	"image/png"
+	"io"
+	"net/http"
+	"os"
+	"path/filepath"
+	"strconv"
+	"strings"
+)
+
+// 图片缩略图：/download/<name>?w=650&h=450 返回等比缩小到该尺寸以内的版本（不放大），
+// 首次请求时生成，按原图内容哈希与尺寸缓存在内容缓存中；
+// 原图不大于目标尺寸、格式无法解码或缩小后反而更大时，照常发送原图
+const (
+	// maxVariantSide 缩略图宽高上限
+	maxVariantSide = 2048
+	// maxVariantSourcePixels 超过该像素数的原图不生成缩略图，直接发送原图
+	maxVariantSourcePixels = 50 << 20
+	variantJPEGQuality     = 85
+	// maxVariantDecodes 同时生成缩略图的数量上限：50M 像素的原图解码后约 200MB，
+	// 不随 CPU 核数增加，峰值内存保持在几百 MB 以内；缩略图生成后即缓存，排队只发生在首次请求时
+	maxVariantDecodes = 2
+)
+
+// variantExts 标准库可以解码的图片格式（BMP、WebP 等照常发送原图）
+var variantExts = map[string]bool{".jpg": true, ".jpeg": true, ".png": true, ".gif": true}
+
+// variantSlots 限制同时生成缩略图的数量（解码大图占用内存较多）
+var variantSlots = make(chan struct{}, maxVariantDecodes)
+
+// variantSize 读取请求的目标尺寸 ?w=&h=（只给一个时另一边不限制）
+func variantSize(r *http.Request) (int, int, bool) {
+	query := r.URL.Query()
+	if !query.Has("w") && !query.Has("h") {
+		return 0, 0, false
+	}
+	side := func(key string) int {
+		n, err := strconv.Atoi(query.Get(key))
+		if err != nil || n <= 0 || n > maxVariantSide {
+			return maxVariantSide
+		}
+		return n
+	}
+	return side("w"), side("h"), true
+}
+
+// fitSize 等比缩小到 maxW x maxH 以内；原图已在范围内时返回 false
+func fitSize(w, h, maxW, maxH int) (int, int, bool) {
+	if w <= maxW && h <= maxH {
+		return w, h, false
+	}
+	if w*maxH > h*maxW {
+		return maxW, max(1, h*maxW/w), true
+	}
+	return max(1, w*maxH/h), maxH, true
+}
+
+// downscale 按面积平均缩小（目标尺寸不大于原图）：逐行把原图转换为 RGBA 后累加到列和，
+// 每个目标像素取其覆盖区域的均值；只需一行原图大小的缓冲区
+func downscale(src image.Image, dw, dh int) *image.RGBA {
+	b := src.Bounds()
+	sw, sh := b.Dx(), b.Dy()
+	dst := image.NewRGBA(image.Rect(0, 0, dw, dh))
+	row := image.NewRGBA(image.Rect(0, 0, sw, 1))
+	cols := make([]uint64, sw*4)
+	sy := 0
+	for dy := 0; dy < dh; dy++ {
+		for i := range cols {
+			cols[i] = 0
+		}
+		y1 := (dy + 1) * sh / dh
+		rows := y1 - sy
+		for ; sy < y1; sy++ {
+			draw.Draw(row, row.Rect, src, image.Pt(b.Min.X, b.Min.Y+sy), draw.Src)
+			for i, v := range row.Pix {
+				cols[i] += uint64(v)
+			}
+		}
+		for dx := 0; dx < dw; dx++ {
+			x0, x1 := dx*sw/dw, (dx+1)*sw/dw
+			var sum [4]uint64
+			for x := x0; x < x1; x++ {
+				sum[0] += cols[x*4]
+				sum[1] += cols[x*4+1]
+				sum[2] += cols[x*4+2]
+				sum[3] += cols[x*4+3]
+			}
+			n := uint64(rows * (x1 - x0))
+			o := dst.PixOffset(dx, dy)
+			for c := 0; c < 4; c++ {
+				dst.Pix[o+c] = uint8((sum[c] + n/2) / n)
+			}
+		}
+	}
+	return dst
+}
+
+// encodeVariant 不透明的图片编码为 JPEG，带透明度的编码为 PNG
+func encodeVariant(img *image.RGBA) ([]byte, error) {
+	var buf bytes.Buffer
+	if img.Opaque() {
+		err := jpeg.Encode(&buf, img, &jpeg.Options{Quality: variantJPEGQuality})
+		return buf.Bytes(), err
+	}
+	err := png.Encode(&buf, img)
+	return buf.Bytes(), err
+}
+
+// makeVariant 解码原图并生成缩略图；不需要或无法生成时返回 nil
+func makeVariant(path string, size int64, maxW, maxH int) []byte {
+	f, err := os.Open(path)
+	if err != nil {
+		return nil
+	}
+	defer f.Close()
+	cfg, _, err := image.DecodeConfig(f)
+	if err != nil || int64(cfg.Width)*int64(cfg.Height) > maxVariantSourcePixels {
+		return nil
+	}
+	dw, dh, ok := fitSize(cfg.Width, cfg.Height, maxW, maxH)
+	if !ok {
+		return nil
+	}
+	if _, err := f.Seek(0, io.SeekStart); err != nil {
+		return nil
+	}
+	src, _, err := image.Decode(f)
+	if err != nil {
+		return nil
+	}
+	data, err := encodeVariant(downscale(src, dw, dh))
+	if err != nil || int64(len(data)) >= size {
+		return nil
+	}
+	return data
+}
+
+// variant 返回缓存的缩略图，必要时生成；不使用缩略图时返回 nil。
+// 缓存键包含原图内容哈希，原图变化后自然不会命中旧的缩略图
+func (s *InfoServer) variant(path string, info os.FileInfo, sum string, maxW, maxH int) []byte {
+	key := fmt.Sprintf("variant:%s:%dx%d", sum, maxW, maxH)
+	mtimeNs := info.ModTime().UnixNano()
+	if data, ok := s.content.get(key, info.Size(), mtimeNs); ok {
+		return nonEmpty(data)
+	}
+	variantSlots <- struct{}{}
+	defer func() { <-variantSlots }()
+	// 排队期间其他请求可能已生成同一缩略图
+	if data, ok := s.content.get(key, info.Size(), mtimeNs); ok {
+		return nonEmpty(data)
+	}
+	data := makeVariant(path, info.Size(), maxW, maxH)
+	if data == nil {
+		// 不使用缩略图时缓存空结果，避免重复解码
+		data = []byte{}
+	}
+	s.content.put(key, path, info.Size(), mtimeNs, data)
+	return nonEmpty(data)
+}
+
+// serveVariant 请求带 ?w=&h= 且原图可以缩小时发送缩略图并返回 true；
+// 响应头 X-Image-Variant 为实际使用的目标尺寸，缩略图不支持 Range
+func (s *InfoServer) serveVariant(w http.ResponseWriter, r *http.Request, path string, info os.FileInfo, sum string) bool {
+	maxW, maxH, ok := variantSize(r)
+	if !ok || sum == "" || !variantExts[strings.ToLower(filepath.Ext(path))] {
+		return false
+	}
+	data := s.variant(path, info, sum, maxW, maxH)
+	if data == nil {
+		return false
+	}
+	size := fmt.Sprintf("%dx%d", maxW, maxH)
+	etag := `"` + sum + "-" + size + `"`
+	w.Header().Set("ETag", etag)
+	w.Header().Set("X-Image-Variant", size)
+	if etagMatches(r, etag) {
+		w.WriteHeader(http.StatusNotModified)
+		return true
+	}
+	w.Header().Set("Content-Type", http.DetectContentType(data))
+	w.Header().Set("Content-Length", strconv.Itoa(len(data)))
+	w.Header().Set("Last-Modified", info.ModTime().UTC().Format(http.TimeFormat))
+	if r.Method != http.MethodHead {
+		_, _ = w.Write(data)
+	}
+	return true
+}
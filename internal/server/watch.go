@@ -0,0 +1,357 @@
+package server
+
+import (
+	"encoding/json"
+	"fmt"
+	"net/http"
+	"os"
+	"path/filepath"
+	"runtime/debug"
+	"strconv"
+	"strings"
+	"sync"
+	"time"
+
+	"gnetconf/internal/system"
+)
+
+// 目录监视：标准库没有跨平台的文件系统通知，按 watchInterval 轮询 info 目录
+// （只读取目录项与文件状态，不读文件内容），发现变化时更新文件索引、递增版本号并唤醒等待中的 /api/changes 请求
+const (
+	watchInterval = 500 * time.Millisecond
+	// maxChangeEvents 保留的最近变化条数，客户端的版本早于保留范围时需要完整同步
+	maxChangeEvents = 1024
+	// changesHeartbeat SSE 连接的心跳间隔，防止中间设备因空闲断开连接
+	changesHeartbeat = 15 * time.Second
+	// 长轮询的默认与最大等待时间
+	longPollTimeout    = 30 * time.Second
+	maxLongPollTimeout = 60 * time.Second
+)
+
+// fileStamp 判断文件是否变化所用的状态
+type fileStamp struct {
+	size    int64
+	mtimeNs int64
+}
+
+// changeEvent 单个文件的变化：op 为 modified（新增或修改）或 deleted
+type changeEvent struct {
+	FileInfo
+	Op      string `json:"op"`
+	version uint64
+}
+
+// dirWatcher 轮询目录并保存最近的变化记录
+type dirWatcher struct {
+	dir string
+	// describe 为变化的文件补充内容哈希等信息（在锁外调用）
+	describe func(name string, st fileStamp) FileInfo
+	// onChange 每批变化记录后调用
+	onChange func()
+	// index 目录的有序索引，供分页列表使用
+	index *fileIndex
+	// scanMu 保证扫描与比较依次进行（定时轮询与写入文件后的立即扫描）
+	scanMu sync.Mutex
+
+	mu      sync.Mutex
+	files   map[string]fileStamp
+	version uint64
+	// floor 更早的变化已丢弃，since 小于 floor 时无法给出完整变化
+	floor  uint64
+	events []changeEvent
+	// notify 每次版本变化时关闭并替换，等待者据此唤醒
+	notify chan struct{}
+}
+
+// newDirWatcher 版本号从当前毫秒时间开始，服务重启后旧版本号必然早于 floor，客户端据此完整同步
+func newDirWatcher(dir string, describe func(string, fileStamp) FileInfo, onChange func()) *dirWatcher {
+	v := uint64(time.Now().UnixMilli())
+	return &dirWatcher{
+		dir:      dir,
+		describe: describe,
+		onChange: onChange,
+		index:    &fileIndex{},
+		version:  v,
+		floor:    v,
+		notify:   make(chan struct{}),
+	}
+}
+
+// scan 读取目录中各文件的状态（跳过子目录）
+func (d *dirWatcher) scan() (map[string]fileStamp, error) {
+	entries, err := os.ReadDir(d.dir)
+	if err != nil {
+		return nil, err
+	}
+	files := make(map[string]fileStamp, len(entries))
+	for _, e := range entries {
+		if e.IsDir() {
+			continue
+		}
+		info, err := e.Info()
+		if err != nil {
+			continue
+		}
+		files[e.Name()] = fileStamp{size: info.Size(), mtimeNs: info.ModTime().UnixNano()}
+	}
+	return files, nil
+}
+
+// init 首次扫描：只记录现状并建立索引，不产生变化
+func (d *dirWatcher) init() {
+	d.scanMu.Lock()
+	defer d.scanMu.Unlock()
+	files, err := d.scan()
+	if err != nil {
+		files = map[string]fileStamp{}
+	}
+	d.index.reset(files)
+	d.mu.Lock()
+	d.files = files
+	d.mu.Unlock()
+}
+
+// run 持续轮询
+func (d *dirWatcher) run() {
+	defer func() {
+		if r := recover(); r != nil {
+			system.WriteCrashLog(fmt.Sprintf("watcher goroutine panic: %v\n\n%s", r, debug.Stack()))
+		}
+	}()
+	ticker := time.NewTicker(watchInterval)
+	defer ticker.Stop()
+	for range ticker.C {
+		d.refresh()
+	}
+}
+
+// refresh 扫描一次目录并记录变化
+func (d *dirWatcher) refresh() {
+	d.scanMu.Lock()
+	defer d.scanMu.Unlock()
+	// 目录暂时无法读取时跳过本轮，不当作文件全部删除
+	if files, err := d.scan(); err == nil {
+		d.update(files)
+	}
+}
+
+// update 与上次扫描结果比较，有变化时记为一个新版本
+func (d *dirWatcher) update(files map[string]fileStamp) {
+	d.mu.Lock()
+	old := d.files
+	d.mu.Unlock()
+
+	var events []changeEvent
+	for name, st := range files {
+		if prev, ok := old[name]; !ok || prev != st {
+			d.index.put(stampInfo(name, st))
+			events = append(events, changeEvent{FileInfo: d.describe(name, st), Op: "modified"})
+		}
+	}
+	for name := range old {
+		if _, ok := files[name]; !ok {
+			d.index.remove(name)
+			events = append(events, changeEvent{FileInfo: FileInfo{Name: name}, Op: "deleted"})
+		}
+	}
+	if len(events) == 0 {
+		return
+	}
+	d.mu.Lock()
+	d.files = files
+	d.mu.Unlock()
+	d.record(events)
+}
+
+// touch 本服务写入文件后调用：只读取这一个文件的状态并立即记录变化，
+// 返回时索引与变化记录已包含该文件；目录中其他文件的变化仍由轮询发现
+func (d *dirWatcher) touch(name string) {
+	d.scanMu.Lock()
+	defer d.scanMu.Unlock()
+	info, err := os.Stat(filepath.Join(d.dir, name))
+	d.mu.Lock()
+	prev, had := d.files[name]
+	d.mu.Unlock()
+
+	var event changeEvent
+	if err == nil && info.Mode().IsRegular() {
+		st := fileStamp{size: info.Size(), mtimeNs: info.ModTime().UnixNano()}
+		if had && prev == st {
+			return
+		}
+		d.index.put(stampInfo(name, st))
+		event = changeEvent{FileInfo: d.describe(name, st), Op: "modified"}
+		d.mu.Lock()
+		d.files[name] = st
+		d.mu.Unlock()
+	} else if had {
+		d.index.remove(name)
+		event = changeEvent{FileInfo: FileInfo{Name: name}, Op: "deleted"}
+		d.mu.Lock()
+		delete(d.files, name)
+		d.mu.Unlock()
+	} else {
+		return
+	}
+	d.record([]changeEvent{event})
+}
+
+// record 把一批变化记为一个新版本并唤醒等待者（调用方持有 scanMu，已更新 files 与索引）
+func (d *dirWatcher) record(events []changeEvent) {
+	d.mu.Lock()
+	d.version++
+	for i := range events {
+		events[i].version = d.version
+	}
+	d.events = append(d.events, events...)
+	if n := len(d.events) - maxChangeEvents; n > 0 {
+		// 按版本整批丢弃，floor 之后的变化始终完整
+		d.floor = d.events[n-1].version
+		for n < len(d.events) && d.events[n].version == d.floor {
+			n++
+		}
+		d.events = append([]changeEvent(nil), d.events[n:]...)
+	}
+	close(d.notify)
+	d.notify = make(chan struct{})
+	d.mu.Unlock()
+
+	d.onChange()
+}
+
+// current 返回当前版本号
+func (d *dirWatcher) current() uint64 {
+	d.mu.Lock()
+	defer d.mu.Unlock()
+	return d.version
+}
+
+// since 返回版本 since 之后的变化（同一文件只保留最后一次）、当前版本，
+// 以及是否需要完整同步（since 早于保留范围或不是本次运行产生的版本）；
+// wait 在下一次变化时关闭
+func (d *dirWatcher) since(since uint64) (events []changeEvent, version uint64, reset bool, wait <-chan struct{}) {
+	d.mu.Lock()
+	defer d.mu.Unlock()
+	if since < d.floor || since > d.version {
+		return nil, d.version, true, d.notify
+	}
+	index := make(map[string]int)
+	for _, e := range d.events {
+		if e.version <= since {
+			continue
+		}
+		if i, ok := index[e.Name]; ok {
+			events[i] = e
+			continue
+		}
+		index[e.Name] = len(events)
+		events = append(events, e)
+	}
+	return events, d.version, false, d.notify
+}
+
+// describeFile 变化通知中附带内容哈希，客户端可据此跳过内容未变的文件
+func (s *InfoServer) describeFile(name string, st fileStamp) FileInfo {
+	info := stampInfo(name, st)
+	info.Hash, _ = s.hashes.get(filepath.Join(s.InfoFolder, name), st.size, st.mtimeNs)
+	return info
+}
+
+// parseSince 从 ?since= 或 SSE 重连时的 Last-Event-ID 读取客户端已知的版本
+func parseSince(r *http.Request) (uint64, bool) {
+	raw := r.URL.Query().Get("since")
+	if raw == "" {
+		raw = r.Header.Get("Last-Event-ID")
+	}
+	v, err := strconv.ParseUint(raw, 10, 64)
+	return v, err == nil
+}
+
+func changesPayload(version uint64, reset bool, events []changeEvent) map[string]any {
+	if events == nil {
+		events = []changeEvent{}
+	}
+	return map[string]any{"success": true, "version": version, "reset": reset, "changes": events}
+}
+
+// handleChanges 变化通知，代替客户端反复拉取清单：
+// 请求头 Accept: text/event-stream 时以 SSE 持续推送，事件 id 为版本号，断线重连时带 Last-Event-ID 续上；
+// 否则为长轮询：?since=版本号，有变化立即返回，没有则最多等待 ?timeout= 秒（默认 30，最大 60）。
+// 不带版本号时立即返回当前版本；reset 为 true 表示变化记录不完整，客户端应完整同步一次
+func (s *InfoServer) handleChanges(w http.ResponseWriter, r *http.Request) {
+	since, hasSince := parseSince(r)
+	if strings.Contains(r.Header.Get("Accept"), "text/event-stream") {
+		s.streamChanges(w, r, since, hasSince)
+		return
+	}
+	if !hasSince {
+		writeJSON(w, changesPayload(s.watch.current(), false, nil))
+		return
+	}
+	timeout := longPollTimeout
+	if sec, err := strconv.Atoi(r.URL.Query().Get("timeout")); err == nil && sec >= 0 {
+		timeout = min(time.Duration(sec)*time.Second, maxLongPollTimeout)
+	}
+	timer := time.NewTimer(timeout)
+	defer timer.Stop()
+	for {
+		events, version, reset, wait := s.watch.since(since)
+		if reset || len(events) > 0 {
+			writeJSON(w, changesPayload(version, reset, events))
+			return
+		}
+		select {
+		case <-wait:
+		case <-timer.C:
+			writeJSON(w, changesPayload(version, false, nil))
+			return
+		case <-r.Context().Done():
+			return
+		}
+	}
+}
+
+// streamChanges SSE 推送：连接建立后先发送一次当前版本（及 Last-Event-ID 之后遗漏的变化），之后每批变化一个事件
+func (s *InfoServer) streamChanges(w http.ResponseWriter, r *http.Request, since uint64, hasSince bool) {
+	rc := http.NewResponseController(w)
+	w.Header().Set("Content-Type", "text/event-stream; charset=utf-8")
+	w.Header().Set("Cache-Control", "no-cache")
+	// 经 nginx 等反向代理时关闭缓冲
+	w.Header().Set("X-Accel-Buffering", "no")
+	if !hasSince {
+		since = s.watch.current()
+	}
+	heartbeat := time.NewTicker(changesHeartbeat)
+	defer heartbeat.Stop()
+
+	first := true
+	for {
+		events, version, reset, wait := s.watch.since(since)
+		if first || reset || len(events) > 0 {
+			data, _ := json.Marshal(changesPayload(version, reset, events))
+			prefix := ""
+			if first {
+				prefix = "retry: 3000\n"
+			}
+			if _, err := fmt.Fprintf(w, "%sid: %d\nevent: changes\ndata: %s\n\n", prefix, version, data); err != nil {
+				return
+			}
+			if err := rc.Flush(); err != nil {
+				return
+			}
+			since, first = version, false
+		}
+		select {
+		case <-wait:
+		case <-heartbeat.C:
+			if _, err := fmt.Fprint(w, ": ping\n\n"); err != nil {
+				return
+			}
+			if err := rc.Flush(); err != nil {
+				return
+			}
+		case <-r.Context().Done():
+			return
+		}
+	}
+}
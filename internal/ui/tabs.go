@@ -127,7 +127,7 @@ func (a *App) openServerURL() {
 
 func (a *App) browseServer(client *server.Client, statusLabel *walk.Label, list *walk.ListBox, content *walk.TextEdit, cache *[]server.FileInfo) {
 	a.runAsync(func() error {
-		ok, data := client.CheckStatus()
+		ok, m := client.FetchManifest()
 		a.mw.Synchronize(func() {
 			if !ok {
 				statusLabel.SetText("⚠ 未检测到服务器: " + a.serverURL)
@@ -136,12 +136,8 @@ func (a *App) browseServer(client *server.Client, statusLabel *walk.Label, list
 				*cache = nil
 				return
 			}
-			fc := 0
-			if v, ok2 := data["files_count"].(float64); ok2 {
-				fc = int(v)
-			}
-			statusLabel.SetText(fmt.Sprintf("✓ 已连接服务器 (文件数: %d)", fc))
-			files := client.FetchFiles()
+			statusLabel.SetText(fmt.Sprintf("✓ 已连接服务器 (文件数: %d)", m.FilesCount))
+			files := m.Files
 			names := make([]string, 0, len(files))
 			for _, f := range files {
 				names = append(names, f.Name)
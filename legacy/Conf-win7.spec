@@ -76,9 +76,17 @@ a = Analysis(
         'core.network',
         'core.hosts',
         'core.system',
+        'core.probe',
+        'core.resolver',
         'utils',
         'utils.cache',
         'utils.server',
+        'utils.sync',
+        'utils.thumbnail',
+        'utils.text_viewer',
+        'utils.change_feed',
+        'utils.retry',
+        'utils.remote_edit',
     ],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+批量 TCP 连通性检测基准测试
+在本机启动两个监听端口：
+  - 正常监听：立即接受连接，对应“可访问”的目标
+  - 静默监听：backlog 占满后不再 accept，新连接的 SYN 被丢弃，对应“超时”的目标
+分别用 10 / 100 / 1000 个目标比较逐个 test_host_connectivity 式检测与 check_tcp_targets 批量检测的耗时。
+
+用法: python benchmarks/probe_bench.py [--timeout 1.0] [--sizes 10,100,1000] [--serial-max 10]
+说明: 静默监听依赖 Linux 的 SYN 丢弃行为；其他系统上超时目标可能表现为“拒绝连接”。
+"""
+import argparse
+import os
+import socket
+import sys
+import time
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from core.probe import check_tcp_targets
+
+
+def open_listener(backlog):
+    """在回环地址上打开一个监听端口"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(backlog)
+    return sock
+
+
+def fill_backlog(listener):
+    """占满静默监听的 accept 队列，使后续连接挂起直至超时"""
+    fillers = []
+    for _ in range(8):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.settimeout(0.2)
+        try:
+            s.connect(listener.getsockname())
+            fillers.append(s)
+        except OSError:
+            s.close()
+            break
+    return fillers
+
+
+def serial_check(targets, timeout):
+    """逐个阻塞连接（与原 test_host_connectivity 行为一致）"""
+    ok = 0
+    for host, port in targets:
+        try:
+            with socket.create_connection((host, port), timeout=timeout):
+                ok += 1
+        except OSError:
+            pass
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量 TCP 连通性检测基准测试")
+    parser.add_argument("--timeout", type=float, default=1.0, help="单次连接超时（秒）")
+    parser.add_argument("--sizes", default="10,100,1000", help="目标数量列表，逗号分隔")
+    parser.add_argument("--serial-max", type=int, default=10, help="逐个检测只跑到该数量，更大规模按比例估算")
+    args = parser.parse_args()
+
+    live = open_listener(1024)
+    silent = open_listener(0)
+    fillers = fill_backlog(silent)
+    live_port = live.getsockname()[1]
+    silent_port = silent.getsockname()[1]
+
+    print(f"{'目标数':>6} {'可访问':>6} {'超时':>6} {'批量耗时(s)':>12} {'逐个耗时(s)':>14}")
+    try:
+        for n in [int(x) for x in args.sizes.split(",") if x.strip()]:
+            # 一半可访问，一半超时
+            targets = [("127.0.0.1", live_port if i % 2 == 0 else silent_port) for i in range(n)]
+
+            started = time.monotonic()
+            results = check_tcp_targets(targets, timeout=args.timeout)
+            batch_elapsed = time.monotonic() - started
+            ok = sum(1 for r in results if r["ok"])
+            timed_out = sum(1 for r in results if r["error"] == "timeout")
+
+            # 积压的连接需要被 accept 掉，避免影响下一轮
+            live.setblocking(False)
+            try:
+                while True:
+                    live.accept()[0].close()
+            except OSError:
+                pass
+
+            if n <= args.serial_max:
+                started = time.monotonic()
+                serial_check(targets, args.timeout)
+                serial_text = f"{time.monotonic() - started:.2f}"
+            else:
+                serial_text = f"~{(n // 2) * args.timeout:.0f} (估算)"
+            print(f"{n:>6} {ok:>6} {timed_out:>6} {batch_elapsed:>12.2f} {serial_text:>14}")
+    finally:
+        for s in fillers:
+            s.close()
+        live.close()
+        silent.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+信息服务器压力测试
+压测已运行的 Go 版 InfoServer（--url，随 NetConf.exe 启动），--info-dir 为该服务器的 info 目录（exe 同级 info），
+先通过 /api/upload 上传测试文件（bench_small.txt / bench_large.bin），
+再用指定数量的并发客户端（各自保持 keep-alive 连接）按比例混合发送：
+  listing  GET /api/files
+  small    GET /download/bench_small.txt
+  large    GET /download/bench_large.bin
+  upload   POST /api/upload（bench_upload.txt，反复覆盖同一文件）
+每轮输出吞吐量、p50/p95/p99 延迟与服务器进程峰值内存（RSS），结果以 JSON 打印或写入文件，
+便于比较不同服务设置（启动服务器时设置的 NETCONF_SERVER_WORKERS 等环境变量）以及部署前发现性能回退。
+测试文件在结束（包括中断）时从 --info-dir 删除，不会被各诊所客户端同步到。
+
+用法: python benchmarks/server_bench.py --url http://127.0.0.1:8080 --info-dir D:/NetConf/info [--pid PID]
+                                       [--clients 1,50,500] [--duration 10] [--mix listing=4,small=4,large=1,upload=1]
+                                       [--output result.json]
+说明: 客户端为 Python 线程，500 并发时压测端本身也会消耗较多 CPU，比较结果时应使用同一台机器与相同参数。
+      所有客户端来自同一 IP，服务器应以 NETCONF_RATE_LIMIT=0 启动以关闭限流；
+      应在测试服务器上压测，测试期间在线的客户端仍会短暂看到测试文件。
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import sys
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 添加项目根目录到 Python 路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from config.settings import SERVER_USERNAME, SERVER_PASSWORD
+
+try:
+    import psutil
+except Exception:
+    psutil = None
+
+SMALL_NAME = "bench_small.txt"
+LARGE_NAME = "bench_large.bin"
+UPLOAD_NAME = "bench_upload.txt"
+# 内存采样间隔（秒）
+RSS_SAMPLE_INTERVAL = 0.2
+OPS = ("listing", "small", "large", "upload")
+
+
+def parse_mix(text):
+    """解析 listing=4,small=4,large=1,upload=1 形式的请求比例"""
+    mix = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPS:
+            raise SystemExit(f"未知请求类型: {name}（可选 {', '.join(OPS)}）")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def op_sequence(mix):
+    """按比例展开为固定的请求序列，各客户端从不同位置开始轮流执行，结果可重复"""
+    seq = []
+    for name in OPS:
+        seq.extend([name] * mix.get(name, 0))
+    if not seq:
+        raise SystemExit("请求比例不能全为 0")
+    return seq
+
+
+def read_rss(pid):
+    """读取进程当前 RSS（字节），无法读取时返回 None"""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except Exception:
+            return None
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class RssSampler(threading.Thread):
+    """后台定时采样服务器进程的 RSS，记录峰值"""
+
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.peak = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            rss = read_rss(self.pid)
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+            self._stop_event.wait(RSS_SAMPLE_INTERVAL)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.peak
+
+
+def upload(session, url, name, data):
+    resp = session.post(f"{url}/api/upload", files={"file": (name, data)}, timeout=60)
+    resp.raise_for_status()
+    if not resp.json().get("success"):
+        raise RuntimeError(resp.text)
+
+
+def prepare_fixtures(url, small_size, large_size):
+    """上传测试文件，返回上传请求使用的内容"""
+    session = requests.Session()
+    session.auth = (SERVER_USERNAME, SERVER_PASSWORD)
+    # 小文件用可压缩的文本，大文件用随机字节
+    line = b"bench config line 0123456789 abcdefghijklmnopqrstuvwxyz\n"
+    small = (line * (small_size // len(line) + 1))[:small_size]
+    upload(session, url, SMALL_NAME, small)
+    upload(session, url, LARGE_NAME, os.urandom(large_size))
+    session.close()
+    return small
+
+
+def remove_fixtures(info_dir):
+    """删除上传到服务器 info 目录的测试文件"""
+    for name in (SMALL_NAME, LARGE_NAME, UPLOAD_NAME):
+        try:
+            os.remove(os.path.join(info_dir, name))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"无法删除测试文件 {name}: {e}", file=sys.stderr)
+
+
+def percentile(sorted_values, q):
+    """最近秩百分位数"""
+    if not sorted_values:
+        return None
+    rank = math.ceil(q / 100.0 * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(1, rank)) - 1]
+
+
+def summarize(latencies):
+    values = sorted(latencies)
+    return {
+        "p50": round(percentile(values, 50) * 1000, 2) if values else None,
+        "p95": round(percentile(values, 95) * 1000, 2) if values else None,
+        "p99": round(percentile(values, 99) * 1000, 2) if values else None,
+    }
+
+
+def client_worker(index, url, seq, upload_body, deadline, results):
+    """单个客户端：独占一个 keep-alive 会话，循环发送请求直到截止时间"""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+    session.auth = (SERVER_USERNAME, SERVER_PASSWORD)
+    ops = itertools.islice(itertools.cycle(seq), index % len(seq), None)
+    records = []
+    for op in ops:
+        if time.monotonic() >= deadline:
+            break
+        started = time.monotonic()
+        ok = False
+        try:
+            if op == "listing":
+                resp = session.get(f"{url}/api/files", timeout=30)
+                ok = resp.ok and resp.json().get("success", False)
+            elif op == "upload":
+                resp = session.post(f"{url}/api/upload", files={"file": (UPLOAD_NAME, upload_body)}, timeout=30)
+                ok = resp.ok and resp.json().get("success", False)
+            else:
+                name = SMALL_NAME if op == "small" else LARGE_NAME
+                with session.get(f"{url}/download/{name}", timeout=60, stream=True) as resp:
+                    for _ in resp.iter_content(256 * 1024):
+                        pass
+                    ok = resp.ok
+        except (requests.RequestException, ValueError):
+            ok = False
+        records.append((op, time.monotonic() - started, ok))
+    session.close()
+    results[index] = records
+
+
+def run_round(url, clients, duration, seq, upload_body, pid):
+    """以指定并发运行一轮，返回统计结果"""
+    sampler = RssSampler(pid) if pid else None
+    if sampler:
+        sampler.start()
+    results = [None] * clients
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+    threads = [threading.Thread(target=client_worker, args=(i, url, seq, upload_body, deadline, results), daemon=True)
+               for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+    peak = sampler.stop() if sampler else None
+
+    records = [r for rs in results if rs for r in rs]
+    ok_latencies = [lat for _, lat, ok in records if ok]
+    by_op = {}
+    for name in OPS:
+        op_records = [(lat, ok) for op, lat, ok in records if op == name]
+        if not op_records:
+            continue
+        by_op[name] = dict(count=len(op_records), errors=sum(1 for _, ok in op_records if not ok),
+                           latency_ms=summarize([lat for lat, ok in op_records if ok]))
+    return {
+        "clients": clients,
+        "elapsed_s": round(elapsed, 2),
+        "requests": len(records),
+        "errors": len(records) - len(ok_latencies),
+        "throughput_rps": round(len(ok_latencies) / elapsed, 1) if elapsed else 0,
+        "latency_ms": summarize(ok_latencies),
+        "by_op": by_op,
+        "server_peak_rss_mb": round(peak / 1048576, 1) if peak else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="信息服务器压力测试")
+    parser.add_argument("--clients", default="1,50,500", help="并发客户端数列表，逗号分隔，每个数运行一轮")
+    parser.add_argument("--duration", type=float, default=10, help="每轮持续时间（秒）")
+    parser.add_argument("--mix", default="listing=4,small=4,large=1,upload=1", help="请求类型比例")
+    parser.add_argument("--small-kb", type=int, default=4, help="小文件大小（KB），上传请求使用同样大小")
+    parser.add_argument("--large-mb", type=int, default=8, help="大文件大小（MB）")
+    parser.add_argument("--url", required=True, help="已运行的服务器地址，如 http://127.0.0.1:8080")
+    parser.add_argument("--info-dir", required=True, help="该服务器的 info 目录，测试结束后从中删除测试文件")
+    parser.add_argument("--pid", type=int, help="服务器进程号，用于采样内存")
+    parser.add_argument("--output", help="结果 JSON 写入该文件（默认打印到标准输出）")
+    args = parser.parse_args()
+
+    seq = op_sequence(parse_mix(args.mix))
+    url = args.url.rstrip("/")
+    if not os.path.isdir(args.info_dir):
+        raise SystemExit(f"info 目录不存在: {args.info_dir}")
+
+    try:
+        upload_body = prepare_fixtures(url, args.small_kb * 1024, args.large_mb * 1024 * 1024)
+        runs = []
+        for clients in [int(x) for x in args.clients.split(",") if x.strip()]:
+            print(f"并发 {clients} 运行 {args.duration:g} 秒...", file=sys.stderr)
+            runs.append(run_round(url, clients, args.duration, seq, upload_body, args.pid))
+    finally:
+        remove_fixtures(args.info_dir)
+
+    report = {
+        "server": url,
+        "mix": args.mix,
+        "duration_s": args.duration,
+        "small_kb": args.small_kb,
+        "large_mb": args.large_mb,
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "runs": runs,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
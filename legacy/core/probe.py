@@ -0,0 +1,236 @@
+"""
+并发探测引擎
+将 ping / TCP 连通性 / 本地文件等检测项放入有界线程池并发执行，
+总耗时约等于最慢的单项检测，而不是各项耗时之和。
+"""
+import errno
+import os
+import selectors
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+from core.resolver import resolve_host
+
+# 线程池上限：检测项都是 I/O 等待型，少量线程即可覆盖全部并发
+PROBE_MAX_WORKERS = 8
+# 检查取消标志的间隔（秒）
+CANCEL_POLL_INTERVAL = 0.2
+
+
+def run_probes(probes, on_result=None, on_complete=None, max_workers=PROBE_MAX_WORKERS, cancel_event=None):
+    """
+    并发执行一组检测项（阻塞直到全部完成，应在后台线程中调用）
+    probes: [(key, func), ...]，func 无参数，返回该项检测结果
+    on_result(key, result, error): 每一项完成时立即回调（在调用 run_probes 的线程中依次调用）
+    on_complete(results): 最后一项完成后回调一次，results 为 {key: result}
+    cancel_event: threading.Event，置位后不再回调，未开始的检测项被取消并立即返回
+    返回 {key: result}，出错的项结果为 None
+    """
+    results = {}
+    if not probes:
+        if on_complete:
+            on_complete(results)
+        return results
+
+    workers = max(1, min(max_workers, len(probes)))
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(func): key for key, func in probes}
+        pending = set(futures)
+        while pending:
+            if cancel_event is not None and cancel_event.is_set():
+                for future in pending:
+                    future.cancel()
+                return results
+            done, pending = wait(pending, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = futures[future]
+                error = None
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = None
+                    error = e
+                results[key] = result
+                if on_result and not (cancel_event is not None and cancel_event.is_set()):
+                    try:
+                        on_result(key, result, error)
+                    except Exception:
+                        pass
+    finally:
+        # 已取消时不等待仍在运行的检测项（如阻塞中的 ping），让其在后台自然结束
+        pool.shutdown(wait=False)
+
+    if on_complete and not (cancel_event is not None and cancel_event.is_set()):
+        on_complete(results)
+    return results
+
+
+# ===================== 批量 TCP 连通性检测 =====================
+# Windows 上 select() 最多监视 512 个套接字，同时在途的连接数需留出余量
+TCP_MAX_INFLIGHT = 500
+# 域名解析是阻塞调用，单独用线程池并发解析
+RESOLVE_MAX_WORKERS = 16
+
+
+def _classify_error(err):
+    """把连接错误归类为简短的错误类型"""
+    if err is None:
+        return None
+    if isinstance(err, socket.gaierror):
+        return "dns"
+    if isinstance(err, socket.timeout):
+        return "timeout"
+    code = err.errno if isinstance(err, OSError) else None
+    if code in (errno.ECONNREFUSED, getattr(errno, "WSAECONNREFUSED", -1)):
+        return "refused"
+    if code in (errno.EHOSTUNREACH, errno.ENETUNREACH,
+                getattr(errno, "WSAEHOSTUNREACH", -1), getattr(errno, "WSAENETUNREACH", -1)):
+        return "unreachable"
+    if code in (errno.ETIMEDOUT, getattr(errno, "WSAETIMEDOUT", -1)):
+        return "timeout"
+    return "error"
+
+
+TCP_ERROR_TEXT = {
+    "dns": "域名解析失败",
+    "timeout": "连接超时",
+    "refused": "连接被拒绝",
+    "unreachable": "网络不可达",
+    "error": "连接失败",
+}
+
+
+def describe_tcp_error(result):
+    """把 check_tcp_targets 的单项结果转换为界面提示文字"""
+    return TCP_ERROR_TEXT.get(result.get("error"), "连接失败")
+
+
+def _resolve(host, port):
+    """经解析缓存解析目标地址，返回 (family, sockaddr) 或抛出 socket.gaierror"""
+    family, address = resolve_host(host)
+    if family == socket.AF_INET6:
+        return family, (address, port, 0, 0)
+    return family, (address, port)
+
+
+def ping_host_cached(host, count=4):
+    """先经解析缓存取得地址再 ping，避免 ping 每次重新解析域名"""
+    from core.network import ping_host
+    try:
+        _, address = resolve_host(host)
+    except socket.gaierror as e:
+        return False, f"域名解析失败: {e}"
+    return ping_host(address, count=count)
+
+
+def check_tcp_targets(targets, timeout=3, on_result=None, cancel_event=None):
+    """
+    批量并行检测 TCP 连通性（非阻塞套接字 + selectors，阻塞直到全部完成）
+    targets: [(host, port), ...]
+    on_result(result): 每个目标有结果时立即回调
+    cancel_event: threading.Event，置位后放弃所有未完成的连接并立即返回
+    返回与 targets 顺序一致的结果列表，每项为字典：
+        host, port, ok, latency_ms, error（None/dns/timeout/refused/unreachable/error）, address
+    所有目标共享同一个超时窗口，总耗时约为一次超时而不是 N 次超时
+    """
+    results = [
+        {"host": host, "port": port, "ok": False, "latency_ms": None, "error": None, "address": None}
+        for host, port in targets
+    ]
+    if not targets:
+        return results
+
+    def finish(idx, err=None, started=None):
+        r = results[idx]
+        r["ok"] = err is None
+        r["error"] = _classify_error(err)
+        if started is not None:
+            r["latency_ms"] = round((time.monotonic() - started) * 1000, 1)
+        if on_result and not (cancel_event is not None and cancel_event.is_set()):
+            try:
+                on_result(r)
+            except Exception:
+                pass
+
+    # 1. 并发解析域名（同名目标只解析一次）
+    pending = []
+    unique = {}
+    for idx, (host, port) in enumerate(targets):
+        unique.setdefault((host, port), []).append(idx)
+    workers = max(1, min(RESOLVE_MAX_WORKERS, len(unique)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_resolve, host, port): (host, port) for host, port in unique}
+        for future in as_completed(futures):
+            indexes = unique[futures[future]]
+            try:
+                family, sockaddr = future.result()
+            except Exception as e:
+                for idx in indexes:
+                    finish(idx, e)
+                continue
+            for idx in indexes:
+                results[idx]["address"] = sockaddr[0]
+                pending.append((idx, family, sockaddr))
+
+    # 2. 非阻塞并行连接，在途连接数受 TCP_MAX_INFLIGHT 限制
+    sel = selectors.DefaultSelector()
+    inflight = 0
+    try:
+        queue = list(reversed(pending))
+        while queue or inflight:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            while queue and inflight < TCP_MAX_INFLIGHT:
+                idx, family, sockaddr = queue.pop()
+                started = time.monotonic()
+                try:
+                    sock = socket.socket(family, socket.SOCK_STREAM)
+                except OSError as e:
+                    finish(idx, e, started)
+                    continue
+                sock.setblocking(False)
+                code = sock.connect_ex(sockaddr)
+                if code == 0:
+                    sock.close()
+                    finish(idx, None, started)
+                    continue
+                if code not in (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY,
+                                getattr(errno, "WSAEWOULDBLOCK", -1)):
+                    sock.close()
+                    finish(idx, OSError(code, os.strerror(code)), started)
+                    continue
+                sel.register(sock, selectors.EVENT_WRITE, (idx, started, started + timeout))
+                inflight += 1
+
+            if not inflight:
+                continue
+            now = time.monotonic()
+            nearest = min(key.data[2] for key in sel.get_map().values())
+            wait_time = max(0.0, nearest - now)
+            if cancel_event is not None:
+                wait_time = min(wait_time, CANCEL_POLL_INTERVAL)
+            for key, _ in sel.select(wait_time):
+                idx, started, _ = key.data
+                sock = key.fileobj
+                sel.unregister(sock)
+                inflight -= 1
+                code = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                sock.close()
+                finish(idx, None if code == 0 else OSError(code, os.strerror(code)), started)
+
+            # 超时的连接直接放弃
+            now = time.monotonic()
+            for key in list(sel.get_map().values()):
+                idx, started, deadline = key.data
+                if now >= deadline:
+                    sel.unregister(key.fileobj)
+                    key.fileobj.close()
+                    inflight -= 1
+                    finish(idx, socket.timeout("timed out"), started)
+    finally:
+        for key in list(sel.get_map().values()):
+            key.fileobj.close()
+        sel.close()
+    return results
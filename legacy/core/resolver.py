@@ -0,0 +1,97 @@
+"""
+进程级域名解析缓存
+医保域名依赖 hosts 文件 / DNS 10.37.128.3，解析失败时往往要等待很久，
+因此成功与失败的结果都缓存一段时间；hosts 或 DNS 被修改后需调用 invalidate_dns_cache()。
+"""
+import ipaddress
+import socket
+import threading
+import time
+
+# 成功结果缓存时间（秒）
+DNS_POSITIVE_TTL = 300
+# 失败结果缓存时间（秒），较短以便网络恢复后尽快重试
+DNS_NEGATIVE_TTL = 30
+
+_lock = threading.Lock()
+# host -> (expires_at, (family, address) 或 None, 失败时的异常)
+_cache = {}
+# host -> threading.Event，同一域名同时只发起一次真实解析
+_inflight = {}
+_stats = {"hits": 0, "misses": 0, "negative_hits": 0, "invalidations": 0}
+
+
+def _is_ip(host):
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+def _lookup(host):
+    """真实解析，优先返回 IPv4 地址"""
+    infos = socket.getaddrinfo(host, None, socket.AF_UNSPEC, socket.SOCK_STREAM)
+    for family, _, _, _, sockaddr in infos:
+        if family == socket.AF_INET:
+            return family, sockaddr[0]
+    family, _, _, _, sockaddr = infos[0]
+    return family, sockaddr[0]
+
+
+def resolve_host(host):
+    """
+    解析域名，返回 (family, address)；解析失败抛出 socket.gaierror
+    结果按 DNS_POSITIVE_TTL / DNS_NEGATIVE_TTL 缓存，IP 地址直接返回不计入统计
+    """
+    if _is_ip(host):
+        family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        return family, host
+
+    while True:
+        with _lock:
+            entry = _cache.get(host)
+            if entry and entry[0] > time.monotonic():
+                if entry[1] is None:
+                    _stats["negative_hits"] += 1
+                    raise socket.gaierror(*entry[2].args)
+                _stats["hits"] += 1
+                return entry[1]
+            waiter = _inflight.get(host)
+            if waiter is None:
+                _inflight[host] = threading.Event()
+                _stats["misses"] += 1
+                break
+        # 其他线程正在解析同一域名，等待其结果后重新查缓存
+        waiter.wait()
+
+    try:
+        result = _lookup(host)
+        with _lock:
+            _cache[host] = (time.monotonic() + DNS_POSITIVE_TTL, result, None)
+        return result
+    except socket.gaierror as e:
+        with _lock:
+            _cache[host] = (time.monotonic() + DNS_NEGATIVE_TTL, None, e)
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(host).set()
+
+
+def invalidate_dns_cache(host=None):
+    """清除解析缓存（hosts 文件或 DNS 变更后调用），host 为空时清除全部"""
+    with _lock:
+        if host is None:
+            _cache.clear()
+        else:
+            _cache.pop(host, None)
+        _stats["invalidations"] += 1
+
+
+def get_dns_cache_stats():
+    """返回缓存命中统计：hits / misses / negative_hits / invalidations / entries"""
+    with _lock:
+        stats = dict(_stats)
+        stats["entries"] = len(_cache)
+    return stats
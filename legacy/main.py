@@ -24,7 +24,14 @@ from config import *
 from core.network import *
 from core.hosts import *
 from core.system import *
+from core.probe import run_probes, check_tcp_targets, describe_tcp_error, ping_host_cached
+from core.resolver import invalidate_dns_cache, get_dns_cache_stats
 from utils.cache import *
+from utils.text_viewer import LargeTextViewer
+try:
+    from utils.thumbnail import load_thumbnail
+except Exception:
+    load_thumbnail = None
 # 可选加载服务器模块，避免依赖缺失导致界面无法启动
 SERVER_AVAILABLE = True
 try:
@@ -39,6 +46,18 @@ except Exception:
         return None
     def fetch_file_content(server_url, filename):
         return None
+try:
+    from utils.sync import sync_server_files, sync_changed_files, DOWNLOAD_CONCURRENCY
+    from utils.change_feed import ChangeFeed
+    from utils.remote_edit import save_text
+except Exception:
+    SERVER_AVAILABLE = False
+    DOWNLOAD_CONCURRENCY = 4
+    ChangeFeed = None
+    save_text = None
+    def sync_server_files(server_url, on_progress=None, on_manifest=None, on_file_done=None,
+                          concurrency=None, cancel_event=None, page=None, image_size=None):
+        return False, [], None
 
 # ===================== 版本检查工具 =====================
 import os
@@ -177,6 +196,17 @@ def check_for_updates_in_background(current_version, root):
     update_thread.start()
 
 
+# ===================== 配置信息展示 =====================
+# 最多保留已解码图片的标签页数，更早访问的图片在切走后释放，再次选中时重新加载
+INFO_IMAGE_TABS_KEEP = 3
+# 每页显示的文件数（按修改时间排序，新上传的在前），只同步当前页的文件
+INFO_PAGE_SIZE = 12
+# 图片显示区域的最大尺寸，同步时只下载服务器缩小到该尺寸以内的版本
+INFO_IMAGE_SIZE = (650, 450)
+# 可以在线编辑的文本文件大小上限（更大的文件只能查看）
+INFO_EDIT_MAX_BYTES = 2 * 1024 * 1024
+
+
 # ===================== 线程工具 =====================
 def run_in_thread(func, on_done=None, on_error=None):
     def wrapper():
@@ -213,6 +243,16 @@ class App:
         self.title_click_count = 0
         self.click_timer = None
         self.server_url_value = "http://14.18.248.25:4888"  # 默认服务器地址
+        # 当前页面的取消标志，切换页面时由 clear() 置位
+        self.page_cancel = threading.Event()
+        # 配置信息同步的取消标志（重新刷新或离开页面时置位）
+        self.info_cancel = None
+        # 配置信息文件的并发下载数
+        self.download_concurrency = DOWNLOAD_CONCURRENCY
+        # 配置信息分页：当前页游标（None 为第一页）、之前各页的游标、下一页游标
+        self.info_cursor = None
+        self.info_prev_cursors = []
+        self.info_next_cursor = None
         
         # 绑定标题栏点击事件（右上角点击3次显示配置）
         self.root.bind("<Button-1>", self.on_title_click)
@@ -456,6 +496,7 @@ class App:
     # ---------- 医保网络检测页面 ----------
     def page_medical_network_check(self):
         self.clear()
+        cancel = self.page_cancel
         tk.Label(self.root, text="医保网络检测", font=self.font_title, bg="#16A34A", fg="white", pady=14).pack(fill=tk.X)
 
         card = tk.Frame(self.root, bg="white")
@@ -531,78 +572,105 @@ class App:
         self.agent_download_btn.pack(side=tk.LEFT, padx=10)
         self.agent_download_btn.pack_forget()  # 初始隐藏
 
-        # 异步执行检测
-        def run_checks():
-            detail_text.insert(tk.END, f"开始检测时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            detail_text.insert(tk.END, "=" * 60 + "\n\n")
-            
-            # 1. ping 10.35.128.1
-            detail_text.insert(tk.END, "【检测1】ping 医保网关 10.35.128.1\n")
-            ping_success, ping_msg = ping_host("10.35.128.1", count=4)
-            if ping_success:
-                ping_status.config(text=f"✓ 连通 ({ping_msg})", fg="#16A34A")
-                detail_text.insert(tk.END, f"结果: ✓ 成功 - {ping_msg}\n\n")
-            else:
-                ping_status.config(text=f"✗ 不通 ({ping_msg})", fg="#EF4444")
-                detail_text.insert(tk.END, f"结果: ✗ 失败 - {ping_msg}\n\n")
-            
-            # 2. hisips.shx.hsip.gov.cn
-            detail_text.insert(tk.END, "【检测2】两定系统 hisips.shx.hsip.gov.cn\n")
-            hisips_ok = test_host_connectivity("hisips.shx.hsip.gov.cn", port=80, timeout=5)
-            if hisips_ok:
-                hisips_status.config(text="✓ 可访问", fg="#16A34A")
-                detail_text.insert(tk.END, "结果: ✓ 可访问\n\n")
-            else:
-                hisips_status.config(text="✗ 无法访问", fg="#EF4444")
-                detail_text.insert(tk.END, "结果: ✗ 无法访问\n\n")
-            
-            # 3. fms.shx.hsip.gov.cn
-            detail_text.insert(tk.END, "【检测3】费用监管系统 fms.shx.hsip.gov.cn\n")
-            fms_ok = test_host_connectivity("fms.shx.hsip.gov.cn", port=80, timeout=5)
-            if fms_ok:
-                fms_status.config(text="✓ 可访问", fg="#16A34A")
-                detail_text.insert(tk.END, "结果: ✓ 可访问\n\n")
-            else:
-                fms_status.config(text="✗ 无法访问", fg="#EF4444")
-                detail_text.insert(tk.END, "结果: ✗ 无法访问\n\n")
-            
-            # 4. cts-svc.shx.hsip.gov.cn
-            detail_text.insert(tk.END, "【检测4】综合服务系统 cts-svc.shx.hsip.gov.cn\n")
-            cts_ok = test_host_connectivity("cts-svc.shx.hsip.gov.cn", port=80, timeout=5)
-            if cts_ok:
-                cts_status.config(text="✓ 可访问", fg="#16A34A")
-                detail_text.insert(tk.END, "结果: ✓ 可访问\n\n")
-            else:
-                cts_status.config(text="✗ 无法访问", fg="#EF4444")
-                detail_text.insert(tk.END, "结果: ✗ 无法访问\n\n")
-            
-            # 5. 防护软件检测
-            agent_path = r"C:\Windows\SysWOW64\IsAgent"
-            agent_exists = os.path.exists(agent_path)
-            detail_text.insert(tk.END, "【检测5】防护软件 IsAgent\n")
-            if agent_exists:
-                agent_status.config(text="✓ 已安装", fg="#16A34A")
-                detail_text.insert(tk.END, f"结果: ✓ 已安装 ({agent_path})\n\n")
-                # 隐藏下载按钮
-                root.after(0, lambda: self.agent_download_btn.pack_forget())
+        # 检测项：key -> (标题, 状态标签)
+        agent_path = r"C:\Windows\SysWOW64\IsAgent"
+        check_rows = {
+            "ping": ("【检测1】ping 医保网关 10.35.128.1", ping_status),
+            "hisips": ("【检测2】两定系统 hisips.shx.hsip.gov.cn", hisips_status),
+            "fms": ("【检测3】费用监管系统 fms.shx.hsip.gov.cn", fms_status),
+            "cts": ("【检测4】综合服务系统 cts-svc.shx.hsip.gov.cn", cts_status),
+            "agent": ("【检测5】防护软件 IsAgent", agent_status),
+        }
+        tcp_keys = {
+            "hisips.shx.hsip.gov.cn": "hisips",
+            "fms.shx.hsip.gov.cn": "fms",
+            "cts-svc.shx.hsip.gov.cn": "cts",
+        }
+
+        def show_result(key, result, error):
+            """单项检测完成后立即刷新对应行（主线程执行）"""
+            if cancel.is_set():
+                return
+            title, status_label = check_rows[key]
+            detail_text.insert(tk.END, title + "\n")
+            if key == "ping":
+                ping_success, ping_msg = result if result else (False, str(error) if error else "检测失败")
+                if ping_success:
+                    status_label.config(text=f"✓ 连通 ({ping_msg})", fg="#16A34A")
+                    detail_text.insert(tk.END, f"结果: ✓ 成功 - {ping_msg}\n\n")
+                else:
+                    status_label.config(text=f"✗ 不通 ({ping_msg})", fg="#EF4444")
+                    detail_text.insert(tk.END, f"结果: ✗ 失败 - {ping_msg}\n\n")
+            elif key == "agent":
+                if result:
+                    status_label.config(text="✓ 已安装", fg="#16A34A")
+                    detail_text.insert(tk.END, f"结果: ✓ 已安装 ({agent_path})\n\n")
+                    self.agent_download_btn.pack_forget()
+                else:
+                    status_label.config(text="✗ 未安装", fg="#EF4444")
+                    detail_text.insert(tk.END, f"结果: ✗ 未安装 ({agent_path})\n\n")
+                    self.agent_download_btn.pack(side=tk.LEFT, padx=10)
             else:
-                agent_status.config(text="✗ 未安装", fg="#EF4444")
-                detail_text.insert(tk.END, f"结果: ✗ 未安装 ({agent_path})\n\n")
-                # 显示下载按钮
-                root.after(0, lambda: self.agent_download_btn.pack(side=tk.LEFT, padx=10))
-            
-            # 总结
+                if result and result["ok"]:
+                    status_label.config(text=f"✓ 可访问 ({result['latency_ms']:.0f}ms)", fg="#16A34A")
+                    detail_text.insert(tk.END, f"结果: ✓ 可访问 - {result['address']} 耗时 {result['latency_ms']:.0f}ms\n\n")
+                else:
+                    reason = describe_tcp_error(result) if result else str(error)
+                    status_label.config(text=f"✗ 无法访问 ({reason})", fg="#EF4444")
+                    detail_text.insert(tk.END, f"结果: ✗ 无法访问 - {reason}\n\n")
+            detail_text.see(tk.END)
+
+        def show_summary(results):
+            """最后一项检测完成后汇总（主线程执行）"""
+            if cancel.is_set():
+                return
+            ping_result = results.get("ping")
+            ping_success = bool(ping_result and ping_result[0])
+            agent_exists = bool(results.get("agent"))
             detail_text.insert(tk.END, "=" * 60 + "\n")
-            all_ok = ping_success and hisips_ok and fms_ok and cts_ok and agent_exists
+            tcp_results = results.get("tcp") or []
+            tcp_ok = bool(tcp_results) and all(r["ok"] for r in tcp_results)
+            all_ok = ping_success and tcp_ok and agent_exists
             if all_ok:
                 detail_text.insert(tk.END, "✓ 所有检测项通过，医保网络正常！\n")
             else:
                 detail_text.insert(tk.END, "⚠ 部分检测项未通过，请检查网络配置\n")
                 if not agent_exists:
                     detail_text.insert(tk.END, "建议：请下载安装防护软件以确保医保网络正常访问！\n")
-            
+            stats = get_dns_cache_stats()
+            detail_text.insert(tk.END, f"DNS 缓存: 命中 {stats['hits'] + stats['negative_hits']} 次 / 解析 {stats['misses']} 次\n")
             detail_text.see(tk.END)
-        
+
+        detail_text.insert(tk.END, f"开始检测时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        detail_text.insert(tk.END, "=" * 60 + "\n\n")
+
+        # 异步并发执行检测：各项结果完成即显示，总耗时约等于最慢的一项
+        def run_checks():
+            def on_tcp_result(r):
+                key = tcp_keys[r["host"]]
+                root.after(0, lambda: show_result(key, r, None))
+
+            def on_probe_result(key, result, error):
+                if key != "tcp":
+                    root.after(0, lambda: show_result(key, result, error))
+                elif error:
+                    # 批量检测整体失败时，各域名行统一显示失败
+                    for k in tcp_keys.values():
+                        root.after(0, lambda k=k: show_result(k, None, error))
+
+            probes = [
+                ("ping", lambda: ping_host_cached("10.35.128.1", count=4)),
+                ("tcp", lambda: check_tcp_targets([(h, 80) for h in tcp_keys], timeout=5,
+                                                  on_result=on_tcp_result, cancel_event=cancel)),
+                ("agent", lambda: os.path.exists(agent_path)),
+            ]
+            run_probes(
+                probes,
+                on_result=on_probe_result,
+                on_complete=lambda results: root.after(0, lambda: show_summary(results)),
+                cancel_event=cancel,
+            )
+
         # 在后台线程运行检测
         run_in_thread(run_checks)
 
@@ -716,6 +784,18 @@ class App:
         # tk.Button(server_btn_frame, text="打开服务器", command=self.open_server_url,
         #          bg="#16A34A", fg="white", font=("微软雅黑", 9), width=10).pack(side=tk.LEFT, padx=(0, 5))
 
+        # 分页
+        self.info_next_btn = tk.Button(server_btn_frame, text="下一页", command=self.info_next_page,
+                                       state=tk.DISABLED, font=("微软雅黑", 9), width=6)
+        self.info_next_btn.pack(side=tk.RIGHT)
+        self.info_page_label = tk.Label(server_btn_frame, text="", bg="white", fg="#6B7280", font=("微软雅黑", 9))
+        self.info_page_label.pack(side=tk.RIGHT, padx=5)
+        self.info_prev_btn = tk.Button(server_btn_frame, text="上一页", command=self.info_prev_page,
+                                       state=tk.DISABLED, font=("微软雅黑", 9), width=6)
+        self.info_prev_btn.pack(side=tk.RIGHT)
+        self.info_cursor = None
+        self.info_prev_cursors = []
+
         # 服务器状态
         self.server_status = tk.Label(right_frame, text="未检测到服务器", bg="white", fg="#6B7280", font=("微软雅黑", 9))
         self.server_status.pack(anchor="w", pady=(0, 10))
@@ -761,117 +841,402 @@ class App:
         """打开服务器管理页面"""
         webbrowser.open(self.server_url_value)
     
+    def info_next_page(self):
+        if self.info_next_cursor:
+            self.info_prev_cursors.append(self.info_cursor)
+            self.info_cursor = self.info_next_cursor
+            self.page_info_display()
+
+    def info_prev_page(self):
+        if self.info_prev_cursors:
+            self.info_cursor = self.info_prev_cursors.pop()
+            self.page_info_display()
+
+    def update_info_pager(self, status_data):
+        """根据服务器返回的分页信息更新翻页按钮；旧版服务器不分页时隐藏页码"""
+        if not hasattr(self, 'info_page_label'):
+            return
+        paged = status_data.get('paged')
+        self.info_next_cursor = status_data.get('next_cursor') if paged else None
+        self.info_prev_btn.config(state=tk.NORMAL if paged and self.info_prev_cursors else tk.DISABLED)
+        self.info_next_btn.config(state=tk.NORMAL if self.info_next_cursor else tk.DISABLED)
+        if paged:
+            pages = max(1, -(-(status_data.get('total') or 0) // INFO_PAGE_SIZE))
+            self.info_page_label.config(text=f"第 {len(self.info_prev_cursors) + 1} / {pages} 页")
+        else:
+            self.info_page_label.config(text="")
+
     def page_info_display(self):
-        """从服务器下载并展示配置信息（自动下载到本地）"""
-        # 检查服务器状态
-        is_connected, status_data = check_server_status(self.server_url_value) if SERVER_AVAILABLE else (False, None)
-        
-        # 安全检查：如果server_status存在才更新
+        """从服务器增量同步并展示当前页的配置信息（只下载新增或变化的文件：多个文件时下载一个压缩包一次解包，否则并发逐个下载）"""
+        # 取消上一次尚未完成的同步（重复点击“刷新信息”时）
+        if self.info_cancel:
+            self.info_cancel.set()
+        self.info_cancel = cancel = threading.Event()
+        notebook = self.info_notebook
+        # 各文件标签页：name -> {frame, bar, label, info（下载完成后的文件信息）, rendered}
+        tabs = {}
+        # 标签页控件路径 -> 文件名
+        tab_names = {}
+        # 已渲染的图片标签页，按最近访问排序（最近的在末尾）
+        recent_images = []
+        # 服务器端口（变化通知更新文件数时沿用）
+        server_port = [8080]
+        # 服务器是否按页返回
+        paged = [False]
+
         if hasattr(self, 'server_status') and self.server_status:
-            if is_connected:
+            self.server_status.config(text=f"正在连接服务器: {self.server_url_value}", fg="#6B7280")
+
+        def clear_tabs():
+            # 旧标签页连同其中的图片一起销毁，避免反复刷新后内存累积
+            for tab in notebook.tabs():
+                notebook.forget(tab)
+                notebook.nametowidget(tab).destroy()
+
+        def show_notice(*lines):
+            clear_tabs()
+            empty_frame = tk.Frame(notebook, bg="white")
+            notebook.add(empty_frame, text="提示")
+            for text, fg, size, pady in lines:
+                tk.Label(empty_frame, text=text, bg="white", fg=fg, font=("微软雅黑", size)).pack(pady=pady)
+
+        def on_manifest(files, status_data):
+            """拿到服务器清单后立即建好全部标签页，下载中的文件先显示进度（主线程执行）"""
+            if cancel.is_set():
+                return
+            server_port[0] = status_data.get('port') or 8080
+            paged[0] = bool(status_data.get('paged'))
+            self.update_info_pager(status_data)
+            # 安全检查：如果server_status存在才更新
+            if hasattr(self, 'server_status') and self.server_status:
                 self.server_status.config(
-                    text=f"✓ 已连接服务器 (端口: {status_data.get('port', 8080)}, 文件数: {status_data.get('files_count', 0)})",
+                    text=f"✓ 已连接服务器 (端口: {server_port[0]}, 文件数: {status_data.get('files_count', len(files))})",
                     fg="#16A34A"
                 )
+            if not files:
+                # 无文件
+                show_notice(("服务器无配置文件", "#6B7280", 12, 30),
+                            ("请在服务器管理页面上传配置文件", "#666", 10, 10))
+                return
+            clear_tabs()
+            # 标签页只建轻量占位，内容在首次选中时才读取、解码和渲染
+            for file_info in files:
+                add_tab(file_info.get('name', ''))
+            notebook.bind("<<NotebookTabChanged>>", on_tab_changed)
+
+        def show_pending(name):
+            """标签页显示等待下载的进度占位"""
+            tab = tabs[name]
+            for child in tab["frame"].winfo_children():
+                child.destroy()
+            progress_label = tk.Label(tab["frame"], text="⬇ 等待下载...", bg="white", fg="#6B7280", font=("微软雅黑", 10))
+            progress_label.pack(pady=(40, 10))
+            progress_bar = ttk.Progressbar(tab["frame"], mode="determinate", maximum=100, length=300)
+            progress_bar.pack(pady=5)
+            tab.update(bar=progress_bar, label=progress_label, info=None, rendered=False)
+
+        def add_tab(filename):
+            frame = tk.Frame(notebook, bg="white")
+            notebook.add(frame, text=filename[:10] + "..." if len(filename) > 10 else filename)
+            tabs[filename] = {"frame": frame}
+            tab_names[str(frame)] = filename
+            show_pending(filename)
+
+        def is_image(name):
+            return os.path.splitext(name)[1].lower() in ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp']
+
+        def render_tab(name):
+            """渲染选中的标签页；图片标签页超出保留数量时释放最久未访问的 PhotoImage"""
+            tab = tabs[name]
+            if is_image(name):
+                if name in recent_images:
+                    recent_images.remove(name)
+                recent_images.append(name)
+            if tab["rendered"] or tab["info"] is None:
+                return
+            self.render_info_tab(tab["frame"], tab["info"])
+            tab["rendered"] = True
+            while len(recent_images) > INFO_IMAGE_TABS_KEEP:
+                old = tabs[recent_images.pop(0)]
+                for child in old["frame"].winfo_children():
+                    child.destroy()
+                old["rendered"] = False
+
+        def on_tab_changed(event):
+            if cancel.is_set():
+                return
+            try:
+                name = tab_names.get(str(notebook.select()))
+            except tk.TclError:
+                return
+            if name:
+                render_tab(name)
+
+        def on_progress(name, done, total):
+            """单个文件下载进度（主线程执行）"""
+            if cancel.is_set() or name not in tabs or not tabs[name]["bar"]:
+                return
+            progress_bar, progress_label = tabs[name]["bar"], tabs[name]["label"]
+            if total:
+                percent = int(done * 100 / total)
+                progress_bar["value"] = percent
+                progress_label.config(text=f"⬇ 下载中 {percent}% ({done}/{total} bytes)")
             else:
+                progress_label.config(text=f"⬇ 下载中 {done} bytes")
+
+        def on_file_done(file_info):
+            """单个文件就绪后移除进度显示，当前选中的标签页立即渲染（主线程执行）"""
+            name = file_info.get('name')
+            if cancel.is_set() or name not in tabs:
+                return
+            tab = tabs[name]
+            if tab["bar"]:
+                tab["bar"].destroy()
+                tab["label"].destroy()
+                tab["bar"] = tab["label"] = None
+            tab["info"] = file_info
+            if tab_names.get(str(notebook.select())) == name:
+                render_tab(name)
+
+        def apply_changes(changes, reset):
+            """服务器文件变化后只更新对应的标签页并同步这些文件（主线程执行）"""
+            if cancel.is_set():
+                return
+            if reset:
+                # 变化记录不完整，完整刷新一次
+                self.page_info_display()
+                return
+            if paged[0]:
+                # 新文件按修改时间排在第一页：正在看第一页时重新加载本页，否则等翻页时再同步；
+                # 其他页上文件的修改不必下载
+                if self.info_cursor is None and any(
+                        c.get('op') != 'deleted' and c.get('name') not in tabs for c in changes):
+                    self.page_info_display()
+                    return
+                changes = [c for c in changes if c.get('op') == 'deleted' or c.get('name') in tabs]
+                if not changes:
+                    return
+            if not tabs:
+                # 替换“服务器无配置文件”提示
+                clear_tabs()
+            for change in changes:
+                name = change.get('name', '')
+                if not name:
+                    continue
+                if change.get('op') == 'deleted':
+                    tab = tabs.pop(name, None)
+                    if tab:
+                        tab_names.pop(str(tab["frame"]), None)
+                        if name in recent_images:
+                            recent_images.remove(name)
+                        notebook.forget(tab["frame"])
+                        tab["frame"].destroy()
+                elif name in tabs:
+                    if name in recent_images:
+                        recent_images.remove(name)
+                    show_pending(name)
+                else:
+                    add_tab(name)
+            notebook.bind("<<NotebookTabChanged>>", on_tab_changed)
+            if not tabs:
+                show_notice(("服务器无配置文件", "#6B7280", 12, 30),
+                            ("请在服务器管理页面上传配置文件", "#666", 10, 10))
+            elif not paged[0] and hasattr(self, 'server_status') and self.server_status:
+                self.server_status.config(text=f"✓ 已连接服务器 (端口: {server_port[0]}, 文件数: {len(tabs)})", fg="#16A34A")
+            run_in_thread(lambda: sync_changed_files(
+                self.server_url_value, changes,
+                on_progress=throttled_progress(),
+                on_file_done=lambda info: root.after(0, lambda: on_file_done(info)),
+                concurrency=self.download_concurrency,
+                cancel_event=cancel,
+                image_size=INFO_IMAGE_SIZE,
+            ))
+
+        def on_done(result):
+            is_connected, _, status_data = result
+            if cancel.is_set():
+                return
+            if is_connected:
+                # 订阅服务器变化，之后只同步变化的文件；离开页面或重新刷新时随 cancel 结束
+                version = (status_data or {}).get('changes_version')
+                if ChangeFeed is not None and version is not None:
+                    ChangeFeed(self.server_url_value,
+                               lambda changes, reset: root.after(0, lambda: apply_changes(changes, reset)),
+                               cancel, since=version).start()
+                return
+            if hasattr(self, 'server_status') and self.server_status:
                 self.server_status.config(
                     text=f"⚠ 未检测到服务器: {self.server_url_value}",
                     fg="#F59E0B"
                 )
-        
-        # 清除现有的标签页
-        for tab in self.info_notebook.tabs():
-            self.info_notebook.forget(tab)
-        
-        if not is_connected:
             # 服务器未连接，显示提示
-            empty_frame = tk.Frame(self.info_notebook, bg="white")
-            self.info_notebook.add(empty_frame, text="提示")
-            
-            tk.Label(empty_frame, text="服务器未连接", bg="white", fg="#F59E0B", font=("微软雅黑", 14)).pack(pady=30)
-            tk.Label(empty_frame, text=f"当前服务器: {self.server_url_value}", bg="white", fg="#666", font=("微软雅黑", 12)).pack(pady=10)
-            tk.Label(empty_frame, text="请检查服务器地址是否正确，或服务器是否已启动", bg="white", fg="#666", font=("微软雅黑", 10)).pack(pady=5)
+            show_notice(("服务器未连接", "#F59E0B", 14, 30),
+                        (f"当前服务器: {self.server_url_value}", "#666", 12, 10),
+                        ("请检查服务器地址是否正确，或服务器是否已启动", "#666", 10, 5))
+
+        def throttled_progress():
+            # 进度回调较频繁，同一文件只在百分比变化时刷新界面
+            last_percent = {}
+
+            def progress(name, done, total):
+                percent = int(done * 100 / total) if total else done // (256 * 1024)
+                if last_percent.get(name) != percent:
+                    last_percent[name] = percent
+                    root.after(0, lambda: on_progress(name, done, total))
+            return progress
+
+        def task():
+            if not SERVER_AVAILABLE:
+                return False, [], None
+            return sync_server_files(
+                self.server_url_value,
+                on_manifest=lambda files, status: root.after(0, lambda: on_manifest(files, status)),
+                on_progress=throttled_progress(),
+                on_file_done=lambda info: root.after(0, lambda: on_file_done(info)),
+                concurrency=self.download_concurrency,
+                cancel_event=cancel,
+                page={"cursor": self.info_cursor, "limit": INFO_PAGE_SIZE, "sort": "mtime"},
+                image_size=INFO_IMAGE_SIZE,
+            )
+
+        run_in_thread(task, on_done=on_done)
+
+    def render_info_tab(self, frame, file_info):
+        """在标签页中展示已同步到本地的文件内容"""
+        filename = file_info.get('name', '')
+        file_ext = os.path.splitext(filename)[1].lower()
+
+        # 同步后的本地副本
+        local_path = file_info.get('local_path')
+
+        if file_ext in ['.txt', '.md', '.py', '.json', '.xml', '.html', '.css', '.js', '.log']:
+            # 文本文件 - 在GUI中直接显示
+            if local_path and os.path.exists(local_path):
+                try:
+                    self.render_text_viewer(frame, local_path, on_edit=lambda: self.open_text_editor(file_info))
+                    return
+                except Exception:
+                    content = "无法读取文件内容"
+            else:
+                content = (fetch_file_content(self.server_url_value, filename) if SERVER_AVAILABLE else None) or "下载失败"
+
+            # 显示文本
+            text_widget = scrolledtext.ScrolledText(frame, wrap=tk.WORD, font=("微软雅黑", 10))
+            text_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+            text_widget.insert(tk.END, content)
+            text_widget.config(state=tk.DISABLED)
+
+        elif file_ext in ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp']:
+            # 图片文件 - 在GUI中显示
+            if local_path and os.path.exists(local_path) and Image is not None and load_thumbnail is not None:
+                try:
+                    # 加载缩放到 650x450 以内的图片（按内容哈希缓存，未变化的图片无需解码原图）
+                    img = load_thumbnail(local_path, file_info.get('hash'), *INFO_IMAGE_SIZE)
+                    photo = ImageTk.PhotoImage(img)
+
+                    # 显示图片
+                    label = tk.Label(frame, image=photo, bg="white")
+                    label.image = photo  # 保持引用
+                    label.pack(padx=10, pady=10)
+
+                except Exception as e:
+                    tk.Label(frame, text=f"无法加载图片: {str(e)}", bg="white", fg="#EF4444").pack(pady=30)
+            else:
+                tk.Label(frame, text="图片加载失败或图像库未安装", bg="white", fg="#EF4444").pack(pady=30)
+        else:
+            # 其他文件 - 显示文件信息
+            file_size = file_info.get('size', 0)
+            tk.Label(frame, text=f"文件: {filename}", bg="white", fg="#2563EB", font=("微软雅黑", 11)).pack(pady=20)
+            tk.Label(frame, text=f"大小: {file_size} bytes", bg="white", fg="#666", font=("微软雅黑", 10)).pack(pady=5)
+
+    def render_text_viewer(self, frame, path, on_edit=None):
+        """按需加载的大文本查看器，顶部提供跳转到行；提供 on_edit 时显示“编辑”按钮"""
+        # 先建索引，读取失败时不留下半个界面
+        viewer = LargeTextViewer(frame, path)
+        bar = tk.Frame(frame, bg="white")
+        bar.pack(fill=tk.X, padx=10, pady=(10, 0))
+        viewer.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        tk.Label(bar, text=f"共 {viewer.total_lines} 行", bg="white", fg="#666", font=("微软雅黑", 9)).pack(side=tk.LEFT)
+        line_var = tk.StringVar()
+
+        def goto(event=None):
+            try:
+                line_var.set(str(viewer.goto_line(int(line_var.get().strip()))))
+            except ValueError:
+                messagebox.showwarning("提示", "请输入有效的行号")
+
+        if on_edit and save_text is not None:
+            ttk.Button(bar, text="编辑", command=on_edit).pack(side=tk.RIGHT, padx=(10, 0))
+        ttk.Button(bar, text="跳转", command=goto).pack(side=tk.RIGHT)
+        entry = ttk.Entry(bar, textvariable=line_var, width=10)
+        entry.pack(side=tk.RIGHT, padx=5)
+        entry.bind("<Return>", goto)
+        tk.Label(bar, text="跳转到行:", bg="white", font=("微软雅黑", 9)).pack(side=tk.RIGHT)
+
+    def open_text_editor(self, file_info):
+        """
+        在线编辑服务器上的文本文件：以同步到本地的副本为基础版本，保存时只把修改过的行发给服务器，
+        其他人已先行修改时提示冲突；保存成功后服务器的变化通知会刷新对应的标签页
+        """
+        filename = file_info.get('name', '')
+        local_path = file_info.get('local_path')
+        try:
+            if os.path.getsize(local_path) > INFO_EDIT_MAX_BYTES:
+                messagebox.showwarning("提示", f"文件超过 {INFO_EDIT_MAX_BYTES // (1024 * 1024)} MB，只能查看")
+                return
+            with open(local_path, "rb") as f:
+                # 基础版本必须是服务器上的原始字节，不做换行转换
+                base_text = f.read().decode("utf-8")
+        except UnicodeDecodeError:
+            messagebox.showwarning("提示", "文件不是 UTF-8 文本，无法在线编辑")
             return
-        
-        # 清空本地缓存并重新下载
-        clear_cache()
-        
-        # 从服务器获取文件列表
-        files = fetch_server_files(self.server_url_value) if SERVER_AVAILABLE else []
-        
-        if not files:
-            # 无文件
-            empty_frame = tk.Frame(self.info_notebook, bg="white")
-            self.info_notebook.add(empty_frame, text="提示")
-            
-            tk.Label(empty_frame, text="服务器无配置文件", bg="white", fg="#6B7280", font=("微软雅黑", 12)).pack(pady=30)
-            tk.Label(empty_frame, text="请在服务器管理页面上传配置文件", bg="white", fg="#666", font=("微软雅黑", 10)).pack(pady=10)
+        except (OSError, TypeError):
+            messagebox.showwarning("提示", "本地副本不存在，请刷新后重试")
             return
-        
-        # 获取文件扩展名
-        def get_file_ext(filename):
-            return os.path.splitext(filename)[1].lower()
-        
-        # 创建标签页展示文件内容
-        for file_info in files:
-            filename = file_info.get('name', '')
-            file_ext = get_file_ext(filename)
-            
-            frame = tk.Frame(self.info_notebook, bg="white")
-            self.info_notebook.add(frame, text=filename[:10] + "..." if len(filename) > 10 else filename)
-            
-            # 下载文件到本地
-            local_path = download_file_to_cache(self.server_url_value, filename) if SERVER_AVAILABLE else None
-            
-            if file_ext in ['.txt', '.md', '.py', '.json', '.xml', '.html', '.css', '.js', '.log']:
-                # 文本文件 - 在GUI中直接显示
-                if local_path and os.path.exists(local_path):
-                    try:
-                        with open(local_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()
-                    except:
-                        content = "无法读取文件内容"
-                else:
-                    content = (fetch_file_content(self.server_url_value, filename) if SERVER_AVAILABLE else None) or "下载失败"
-                
-                # 显示文本
-                text_widget = scrolledtext.ScrolledText(frame, wrap=tk.WORD, font=("微软雅黑", 10))
-                text_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-                text_widget.insert(tk.END, content)
-                text_widget.config(state=tk.DISABLED)
-                
-            elif file_ext in ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp']:
-                # 图片文件 - 在GUI中显示
-                if local_path and os.path.exists(local_path) and Image is not None:
-                    try:
-                        # 加载图片
-                        img = Image.open(local_path)
-                        
-                        # 计算缩放尺寸
-                        max_width = 650
-                        max_height = 450
-                        width, height = img.size
-                        ratio = min(max_width / width, max_height / height)
-                        new_width = int(width * ratio)
-                        new_height = int(height * ratio)
-                        
-                        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                        photo = ImageTk.PhotoImage(img)
-                        
-                        # 显示图片
-                        label = tk.Label(frame, image=photo, bg="white")
-                        label.image = photo  # 保持引用
-                        label.pack(padx=10, pady=10)
-                        
-                    except Exception as e:
-                        tk.Label(frame, text=f"无法加载图片: {str(e)}", bg="white", fg="#EF4444").pack(pady=30)
-                else:
-                    tk.Label(frame, text="图片加载失败或图像库未安装", bg="white", fg="#EF4444").pack(pady=30)
+        # 文本框内统一使用 LF，保存时还原为文件原来的 CRLF
+        crlf = "\r\n" in base_text
+
+        win = tk.Toplevel(self.root)
+        win.title(f"编辑 - {filename}")
+        win.geometry("760x540")
+        win.transient(self.root)
+        text = scrolledtext.ScrolledText(win, wrap=tk.NONE, undo=True, font=("Consolas", 10))
+        text.insert("1.0", base_text.replace("\r\n", "\n") if crlf else base_text)
+        text.edit_reset()
+        bar = tk.Frame(win)
+        bar.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=8)
+        text.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 0))
+        status = tk.Label(bar, text="", fg="#6B7280", font=("微软雅黑", 9))
+        status.pack(side=tk.LEFT)
+
+        def on_saved(result):
+            ok, message, _ = result
+            if not win.winfo_exists():
+                return
+            save_btn.config(state=tk.NORMAL)
+            if ok:
+                win.destroy()
+                messagebox.showinfo("提示", message or f"已保存: {filename}")
             else:
-                # 其他文件 - 显示文件信息
-                file_size = file_info.get('size', 0)
-                tk.Label(frame, text=f"文件: {filename}", bg="white", fg="#2563EB", font=("微软雅黑", 11)).pack(pady=20)
-                tk.Label(frame, text=f"大小: {file_size} bytes", bg="white", fg="#666", font=("微软雅黑", 10)).pack(pady=5)
+                status.config(text="")
+                messagebox.showerror("保存失败", message or "保存失败", parent=win)
+
+        def save():
+            new_text = text.get("1.0", "end-1c")
+            if crlf:
+                new_text = new_text.replace("\n", "\r\n")
+            if new_text == base_text:
+                win.destroy()
+                return
+            save_btn.config(state=tk.DISABLED)
+            status.config(text="正在保存...")
+            run_in_thread(lambda: save_text(self.server_url_value, filename, new_text, base_text=base_text),
+                          on_done=on_saved)
+
+        ttk.Button(bar, text="取消", command=win.destroy).pack(side=tk.RIGHT)
+        save_btn = ttk.Button(bar, text="保存", command=save)
+        save_btn.pack(side=tk.RIGHT, padx=5)
 
     def start_dual_wan_config(self):
         """开始双WAN配置"""
@@ -985,6 +1350,7 @@ class App:
             
             added = modify_hosts()
             if added:
+                invalidate_dns_cache()
                 return f"已补全 {len(added)} 个条目:\n" + "\n".join(added)
             return "hosts 文件无变化"
 
@@ -1137,6 +1503,8 @@ class App:
                 missing = ["IP 地址", "路由", "MTU", "hosts 文件"]
             if missing:
                 apply_missing_config(self.iface, ip, mask, dns, missing, progress_callback)
+                # hosts / DNS 可能已变更，旧的解析结果不再可信
+                invalidate_dns_cache()
             return missing
 
         def on_done(missing):
@@ -1156,39 +1524,34 @@ class App:
     # ---------- 校验页面 ----------
     def page_verify(self):
         self.clear()
+        cancel = self.page_cancel
         tk.Label(self.root, text="配置校验", font=self.font_title, bg="#2563EB", fg="white", pady=12).pack(fill=tk.X)
 
         card = tk.Frame(self.root, bg="white")
         card.pack(padx=20, pady=20, fill=tk.BOTH, expand=True)
 
-        ip = "未获取"
-        for name, addr in get_interfaces():
-            if name == self.iface:
-                ip = addr
-                break
-
-        def row_status(title, ok):
+        def row_status(title):
             f = tk.Frame(card, bg="white")
             f.pack(anchor="w", padx=15, pady=6)
             tk.Label(f, text=title, width=12, bg="white", font=("微软雅黑", 10, "bold")).pack(side=tk.LEFT)
-            status = "🟢 已配置" if ok else "🔴 缺失"
-            lbl = tk.Label(f, text=status, bg="white", font=("微软雅黑", 10))
+            lbl = tk.Label(f, text="⏳ 检测中...", bg="white", fg="#F59E0B", font=("微软雅黑", 10))
             lbl.pack(side=tk.LEFT)
             return lbl
 
-        ip_ok = ip_already_set(self.iface)
-        mtu_ok = mtu_already_set(self.iface)
-        hosts_ok = hosts_already_set()
-        ip_row = row_status("IP 地址", ip_ok)
-        mtu_row = row_status("MTU", mtu_ok)
-        hosts_row = row_status("hosts 文件", hosts_ok)
+        # 先画出页面占位，所有检测在后台进行，结果到达后逐行刷新
+        rows = {
+            "ip": row_status("IP 地址"),
+            "mtu": row_status("MTU"),
+            "hosts": row_status("hosts 文件"),
+        }
 
         tk.Label(card, text="医保地址连通性测试", bg="white", font=("微软雅黑", 10, "bold")).pack(anchor="w", padx=15, pady=(15, 5))
         hosts = ["hisips.shx.hsip.gov.cn", "fms.shx.hsip.gov.cn", "cts-svc.shx.hsip.gov.cn"]
+        host_rows = {}
         for h in hosts:
-            ok = test_host_connectivity(h)
-            lbl = tk.Label(card, text=f"{h}: {'🟢 可访问' if ok else '🔴 不可访问'}", bg="white", font=("微软雅黑", 10))
+            lbl = tk.Label(card, text=f"{h}: ⏳ 检测中...", bg="white", fg="#F59E0B", font=("微软雅黑", 10))
             lbl.pack(anchor="w", padx=25)
+            host_rows[h] = lbl
 
         link = tk.Label(card, text="访问医保官网", fg="#2563EB", bg="white", cursor="hand2", font=("微软雅黑", 10, "underline"))
         link.pack(anchor="w", padx=15, pady=10)
@@ -1203,7 +1566,67 @@ class App:
         tk.Button(btn_frame, text="关闭", command=self.root.destroy,
                  bg="#6B7280", fg="white", font=("微软雅黑", 10), width=12, height=2).pack(side=tk.LEFT, padx=10)
 
+        iface = self.iface
+
+        def current_ip():
+            for name, addr in get_interfaces():
+                if name == iface:
+                    return ip_already_set(iface), addr
+            return ip_already_set(iface), "未获取"
+
+        def show_row(key, result, error):
+            """单项校验结果到达后刷新对应行（主线程执行）"""
+            if cancel.is_set():
+                return
+            if key == "ip":
+                ok, ip = result if result else (False, "未获取")
+                text = f"🟢 已配置 ({ip})" if ok else f"🔴 缺失 ({ip})"
+            else:
+                ok = bool(result)
+                text = "🟢 已配置" if ok else "🔴 缺失"
+            if error:
+                text = f"🔴 检测失败: {error}"
+            rows[key].config(text=text, fg="#16A34A" if ok and not error else "#EF4444")
+
+        def show_host(r):
+            if cancel.is_set():
+                return
+            if r["ok"]:
+                host_rows[r["host"]].config(text=f"{r['host']}: 🟢 可访问 ({r['latency_ms']:.0f}ms)", fg="#16A34A")
+            else:
+                host_rows[r["host"]].config(text=f"{r['host']}: 🔴 不可访问 ({describe_tcp_error(r)})", fg="#EF4444")
+
+        def run_checks():
+            probes = [
+                ("ip", current_ip),
+                ("mtu", lambda: mtu_already_set(iface)),
+                ("hosts", hosts_already_set),
+                ("tcp", lambda: check_tcp_targets(
+                    [(h, 80) for h in hosts],
+                    on_result=lambda r: root.after(0, lambda: show_host(r)),
+                    cancel_event=cancel,
+                )),
+            ]
+
+            def on_probe_result(key, result, error):
+                # 连通性各行已由 show_host 逐个刷新
+                if key != "tcp":
+                    root.after(0, lambda: show_row(key, result, error))
+                elif error:
+                    for h in hosts:
+                        root.after(0, lambda h=h: show_host({"host": h, "ok": False, "error": "error"}))
+
+            run_probes(probes, on_result=on_probe_result, cancel_event=cancel)
+
+        # 离开页面时 clear() 会置位 cancel，未完成的检测随之取消
+        run_in_thread(run_checks)
+
     def clear(self):
+        # 通知上一页面的后台检测停止
+        self.page_cancel.set()
+        self.page_cancel = threading.Event()
+        if self.info_cancel:
+            self.info_cancel.set()
         for w in self.root.winfo_children():
             w.destroy()
 
@@ -22,9 +22,17 @@ a = Analysis(
         'core.network',
         'core.hosts',
         'core.system',
+        'core.probe',
+        'core.resolver',
         'utils',
         'utils.cache',
         'utils.server',
+        'utils.sync',
+        'utils.thumbnail',
+        'utils.text_viewer',
+        'utils.change_feed',
+        'utils.retry',
+        'utils.remote_edit',
         'tkinter',
         'tkinter.messagebox',
         'tkinter.simpledialog',
@@ -0,0 +1,52 @@
+"""utils.thumbnail：缩略图解码与缓存"""
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import thumbnail  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def cache_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(thumbnail, "get_cache_folder", lambda: str(tmp_path / "cache"))
+
+
+def _save(tmp_path, img, name):
+    path = str(tmp_path / name)
+    img.save(path)
+    return path
+
+
+@pytest.mark.parametrize("name, img", [
+    # 调色板图片与 1 位图不能直接 reduce()，需先转换模式
+    ("large.gif", Image.new("RGB", (2600, 1800), (200, 30, 30)).convert("P")),
+    ("palette.png", Image.new("RGB", (2600, 1800), (30, 200, 30)).quantize(16)),
+    ("mono.png", Image.new("1", (2600, 1800), 1)),
+    ("gray.png", Image.new("L", (2600, 1800), 128)),
+    ("photo.jpg", Image.new("RGB", (2600, 1800), (30, 30, 200))),
+])
+def test_large_images_are_reduced(tmp_path, name, img):
+    path = _save(tmp_path, img, name)
+    thumb = thumbnail.load_thumbnail(path, None, 650, 450)
+    assert thumb.size == (650, 450)
+    assert thumb.mode in ("RGB", "RGBA")
+
+
+def test_transparent_palette_keeps_alpha(tmp_path):
+    img = Image.new("P", (2600, 1800), 0)
+    img.putpalette([0, 0, 0, 255, 255, 255])
+    img.info["transparency"] = 0
+    path = _save(tmp_path, img, "alpha.png")
+    assert thumbnail.load_thumbnail(path, None, 650, 450).mode == "RGBA"
+
+
+def test_cached_thumbnail_is_reused(tmp_path):
+    path = _save(tmp_path, Image.new("RGB", (2600, 1800)).convert("P"), "cached.gif")
+    first = thumbnail.load_thumbnail(path, "abc", 650, 450)
+    os.remove(path)
+    second = thumbnail.load_thumbnail(path, "abc", 650, 450)
+    assert second.size == first.size == (650, 450)
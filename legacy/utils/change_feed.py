@@ -0,0 +1,105 @@
+"""
+服务器文件变化通知
+保持一条到 /api/changes 的 SSE 长连接，服务器目录变化后一秒内回调，
+客户端只需同步变化的文件（见 utils.sync.sync_changed_files），不必反复拉取状态与清单。
+连接断开后带 Last-Event-ID 自动重连，期间遗漏的变化由服务器补发；旧版服务器没有该接口时直接结束。
+"""
+import json
+import random
+import threading
+
+import requests
+
+from config.settings import SERVER_USERNAME, SERVER_PASSWORD
+from utils.retry import RequestCancelled, request_with_backoff
+
+# 建立连接的超时（秒）
+CONNECT_TIMEOUT = 5
+# 服务器每 15 秒发送一次心跳，超过该时间没有收到任何数据即视为连接已断开
+READ_TIMEOUT = 40
+# 断线重连的等待时间（秒），连续失败时逐次加倍，另加最多一半的随机抖动（服务器重启后客户端错开重连）
+RECONNECT_DELAY = 1
+MAX_RECONNECT_DELAY = 30
+
+
+def iter_events(resp):
+    """解析 SSE 响应流，逐个返回 (id, event, data)"""
+    event_id = event = None
+    data = []
+    for line in resp.iter_lines():
+        line = line.decode("utf-8", errors="replace")
+        if not line:
+            if data:
+                yield event_id, event or "message", "\n".join(data)
+            event, data = None, []
+            continue
+        if line.startswith(":"):
+            # 注释行（心跳）
+            continue
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "id":
+            event_id = value
+        elif field == "event":
+            event = value
+        elif field == "data":
+            data.append(value)
+
+
+class ChangeFeed(threading.Thread):
+    """
+    后台订阅服务器文件变化
+    on_changes(changes, reset): 每批变化回调一次（在订阅线程中），changes 每项为文件信息加 op（modified / deleted）；
+        reset 为 True 表示服务器已丢弃部分变化记录（或已重启），应完整同步一次
+    stop_event: threading.Event，置位后结束（最迟在下一次心跳时退出）
+    since: 已同步到的版本号（sync_server_files 返回的 changes_version），为空时从当前版本开始
+    """
+
+    def __init__(self, server_url, on_changes, stop_event, since=None):
+        super().__init__(daemon=True)
+        self.server_url = server_url
+        self.on_changes = on_changes
+        self.stop_event = stop_event
+        self.version = since
+
+    def run(self):
+        delay = RECONNECT_DELAY
+        session = requests.Session()
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    if not self._listen(session):
+                        return
+                    delay = RECONNECT_DELAY
+                except RequestCancelled:
+                    return
+                except (requests.RequestException, ValueError):
+                    delay = min(delay * 2, MAX_RECONNECT_DELAY)
+                if self.stop_event.wait(delay + random.uniform(0, delay / 2)):
+                    return
+        finally:
+            session.close()
+
+    def _listen(self, session):
+        """保持一次 SSE 连接直到断开；服务器不支持变化通知时返回 False"""
+        headers = {"Accept": "text/event-stream"}
+        if self.version is not None:
+            headers["Last-Event-ID"] = str(self.version)
+        with request_with_backoff(session, "GET", f"{self.server_url}/api/changes", cancel_event=self.stop_event,
+                                  auth=(SERVER_USERNAME, SERVER_PASSWORD), headers=headers, stream=True,
+                                  timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)) as resp:
+            if resp.status_code == 404:
+                return False
+            resp.raise_for_status()
+            for _, event, data in iter_events(resp):
+                if self.stop_event.is_set():
+                    break
+                if event != "changes":
+                    continue
+                payload = json.loads(data)
+                self.version = payload.get("version")
+                changes = payload.get("changes") or []
+                if changes or payload.get("reset"):
+                    self.on_changes(changes, bool(payload.get("reset")))
+        return True
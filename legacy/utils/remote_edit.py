@@ -0,0 +1,79 @@
+"""
+服务器文件在线编辑的增量保存
+只把相对基础版本修改过的行发给服务器（/api/patch），服务器按 base_hash 校验基础版本，
+其他人已修改时返回冲突；旧版服务器没有 /api/patch 时退回整体保存（/api/save）。
+base_text 必须是从服务器下载的原始字节按 UTF-8 解码所得（不做换行转换），否则哈希与行号对不上。
+"""
+import difflib
+import hashlib
+
+import requests
+
+from config.settings import SERVER_USERNAME, SERVER_PASSWORD
+from utils.retry import request_with_backoff
+
+# 保存请求超时（秒）
+SAVE_TIMEOUT = 30
+
+
+def text_sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def split_lines(text):
+    """只按 LF 切分并保留换行符（与服务器一致；str.splitlines 还会在 CR、NEL 等字符处切分）"""
+    parts = text.split("\n")
+    lines = [p + "\n" for p in parts[:-1]]
+    if parts[-1]:
+        lines.append(parts[-1])
+    return lines
+
+
+def make_line_patch(base_text, new_text):
+    """
+    生成基于行的补丁：[{start, delete, insert}]，start 为基础版本中的行号（从 0 开始），
+    insert 为插入的行（保留换行符）
+    """
+    a = split_lines(base_text)
+    b = split_lines(new_text)
+    hunks = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag != "equal":
+            hunks.append({"start": i1, "delete": i2 - i1, "insert": b[j1:j2]})
+    return hunks
+
+
+def save_text(server_url, filename, new_text, base_text=None, base_hash=None, session=None):
+    """
+    保存编辑后的文本
+    提供 base_text 时只发送补丁（base_hash 为空时按 base_text 计算），否则整体保存
+    返回 (是否成功, 提示信息, 服务器上的新内容哈希或冲突时的当前哈希)
+    """
+    http = session or requests
+    auth = (SERVER_USERNAME, SERVER_PASSWORD)
+    try:
+        if base_text is not None:
+            payload = {
+                "filename": filename,
+                "base_hash": base_hash or text_sha256(base_text),
+                "patch": make_line_patch(base_text, new_text),
+            }
+            # 被限流（429）或服务器繁忙（503）时补丁未被应用，等待后原样重试
+            resp = request_with_backoff(http, "POST", f"{server_url}/api/patch", json=payload, auth=auth,
+                                        timeout=SAVE_TIMEOUT)
+            if resp.status_code != 404:
+                data = resp.json()
+                if data.get("conflict"):
+                    return False, data.get("message", "文件已被其他人修改"), data.get("hash")
+                return bool(data.get("success")), data.get("message", ""), data.get("hash")
+
+        # 整体保存；旧版服务器忽略 base_hash，不做冲突校验
+        payload = {"filename": filename, "content": new_text}
+        if base_hash:
+            payload["base_hash"] = base_hash
+        resp = request_with_backoff(http, "POST", f"{server_url}/api/save", json=payload, auth=auth,
+                                    timeout=SAVE_TIMEOUT)
+        data = resp.json()
+        return bool(data.get("success")), data.get("message", ""), data.get("hash")
+    except Exception as e:
+        return False, f"保存失败: {e}", None
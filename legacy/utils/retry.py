@@ -0,0 +1,63 @@
+"""
+服务器限流与过载时的重试
+服务器返回 429（请求过于频繁）或 503（繁忙）时按 Retry-After 等待后重试，
+并加入随机抖动，避免大量客户端在同一时刻一起重试。
+"""
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+# 可重试的状态码
+RETRY_STATUS = (429, 503)
+# 最多重试次数
+THROTTLE_RETRIES = 3
+# 没有 Retry-After 时的初始等待（秒），每次重试加倍
+BACKOFF_BASE = 0.5
+# 单次等待上限（秒）
+MAX_RETRY_DELAY = 30
+
+
+class RequestCancelled(Exception):
+    """等待重试期间被取消"""
+
+
+def retry_after(resp):
+    """解析 Retry-After（秒数或 HTTP 日期），没有或无法解析时返回 None"""
+    value = (resp.headers.get("Retry-After") or "").strip()
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(resp, attempt):
+    """第 attempt 次（从 0 开始）重试前的等待时间：不短于 Retry-After，再加最多一半的随机抖动"""
+    base = max(retry_after(resp) or 0, BACKOFF_BASE * (2 ** attempt))
+    base = min(base, MAX_RETRY_DELAY)
+    return base + random.uniform(0, base / 2)
+
+
+def request_with_backoff(http, method, url, cancel_event=None, retries=THROTTLE_RETRIES, **kwargs):
+    """
+    发送请求，遇到 429 / 503 时等待后重试，重试用完后返回最后一次响应
+    http: requests.Session 或 requests 模块
+    cancel_event: threading.Event，等待期间置位时抛出 RequestCancelled（不返回已关闭的响应）
+    """
+    attempt = 0
+    while True:
+        resp = http.request(method, url, **kwargs)
+        if resp.status_code not in RETRY_STATUS or attempt >= retries:
+            return resp
+        delay = backoff_delay(resp, attempt)
+        attempt += 1
+        # 先释放连接再等待
+        resp.close()
+        if cancel_event is not None:
+            if cancel_event.wait(delay):
+                raise RequestCancelled(url)
+        else:
+            time.sleep(delay)
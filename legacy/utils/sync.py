@@ -0,0 +1,853 @@
+"""
+服务器文件增量同步
+本地缓存目录中保存一份清单（文件名、大小、修改时间、内容哈希），
+刷新时只下载新增或变化的文件，并删除服务器上已移除文件的本地副本。
+"""
+import hashlib
+import json
+import os
+import threading
+import zipfile
+from email.utils import formatdate
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ChunkedEncodingError
+
+from config.settings import SERVER_USERNAME, SERVER_PASSWORD
+from utils.cache import get_cache_folder
+from utils.retry import RequestCancelled, request_with_backoff
+
+# 本地清单文件名（位于缓存目录，以点开头避免与服务器文件重名）
+MANIFEST_NAME = ".sync_manifest.json"
+# 列表请求超时（秒）
+LIST_TIMEOUT = 5
+# 单个文件下载超时（秒）
+DOWNLOAD_TIMEOUT = 30
+# 同时进行的下载数（也是 keep-alive 连接池大小）
+DOWNLOAD_CONCURRENCY = 4
+# 计算哈希时每次读取的块大小
+HASH_CHUNK_SIZE = 64 * 1024
+# 下载中途连接断开时的续传次数
+DOWNLOAD_RETRIES = 3
+# 可以从断点续传的错误（连接断开、超时、分块传输中断）
+RESUMABLE_ERRORS = (requests.ConnectionError, requests.Timeout, ChunkedEncodingError)
+# 需要下载的文件不少于该数量时改为下载一个压缩包（/api/bundle），高延迟链路上一次请求代替 N 次
+BUNDLE_MIN_FILES = 2
+# 压缩包内的清单
+BUNDLE_MANIFEST_NAME = ".bundle/manifest.json"
+# 压缩包下载中的片段（位于缓存目录），续传信息保存在同名 .json 中
+BUNDLE_PART_NAME = ".bundle.zip.part"
+
+# 本地清单的读写（完整同步与按变化同步可能同时进行）
+_manifest_lock = threading.Lock()
+# 按变化同步逐批进行
+_changes_lock = threading.Lock()
+# 不支持打包下载的服务器（旧版），本次运行不再尝试
+_no_bundle = set()
+# 每个缓存文件一把锁，写入（下载、解包）同一文件的操作依次进行
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+# 按显示尺寸请求服务器缩略图的图片类型（服务器无法缩小的格式照常返回原图）
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp")
+
+# 单次下载请求的结果
+DONE = "done"
+NOT_MODIFIED = "not_modified"
+RESTART = "restart"
+
+
+def _auth():
+    return (SERVER_USERNAME, SERVER_PASSWORD)
+
+
+def _manifest_path():
+    return os.path.join(get_cache_folder(), MANIFEST_NAME)
+
+
+def _read_manifest_file():
+    try:
+        with open(_manifest_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def load_manifest():
+    """读取本地清单，返回 {name: {size, mtime, hash, etag}}"""
+    return _read_manifest_file().get("files", {})
+
+
+def load_listing():
+    """读取上次的服务器清单响应及其 ETag：{url, etag, data}，没有时返回 None"""
+    return _read_manifest_file().get("listing")
+
+
+def load_bundle_version():
+    """读取上次解包的压缩包版本号，没有时返回 None"""
+    return _read_manifest_file().get("bundle_version")
+
+
+def save_manifest(entries, listing=None, bundle_version=None):
+    """
+    原子写入本地清单（listing 为服务器清单响应缓存，用于条件请求；
+    bundle_version 为上次解包的压缩包版本号，下次只下载此后变化的文件）
+    """
+    path = _manifest_path()
+    tmp = path + ".tmp"
+    data = {"files": entries}
+    if listing:
+        data["listing"] = listing
+    if bundle_version is not None:
+        data["bundle_version"] = bundle_version
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def file_sha256(path):
+    """分块计算文件 SHA-256"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _file_lock(name):
+    """返回缓存文件 name 的锁"""
+    name = os.path.basename(name)
+    with _file_locks_guard:
+        lock = _file_locks.get(name)
+        if lock is None:
+            lock = _file_locks[name] = threading.Lock()
+        return lock
+
+
+def _local_path(name):
+    # 只取文件名部分，防止服务器返回的名字跳出缓存目录
+    return os.path.join(get_cache_folder(), os.path.basename(name))
+
+
+def _server_mtime(file_info):
+    # 新版服务器清单提供纳秒精度的 mtime_ns，旧版列表只有精确到秒的 modified
+    return file_info.get("mtime_ns") or file_info.get("modified")
+
+
+def _variant_for(name, image_size):
+    """图片按显示尺寸下载时的缩略图规格（如 650x450），其他文件为 None"""
+    if image_size and os.path.splitext(name)[1].lower() in IMAGE_EXTS:
+        return f"{image_size[0]}x{image_size[1]}"
+    return None
+
+
+def _is_current(file_info, entry):
+    """本地副本是否与服务器文件一致（缩略图还要求规格相同）"""
+    if not entry:
+        return False
+    if entry.get("size") != file_info.get("size") or entry.get("mtime") != _server_mtime(file_info):
+        return False
+    if entry.get("variant") != file_info.get("variant"):
+        return False
+    server_hash = file_info.get("hash")
+    if server_hash and entry.get("hash") != server_hash:
+        return False
+    path = _local_path(file_info["name"])
+    # 缩略图的本地大小与服务器原图不同，以下载时记录的大小为准
+    return os.path.exists(path) and os.path.getsize(path) == entry.get("local_size", entry.get("size"))
+
+
+def fetch_manifest(session, server_url, listing=None):
+    """
+    获取服务器清单（状态 + 文件列表 + 内容哈希），一次请求完成
+    旧版服务器没有 /api/manifest 时退回 /api/files
+    listing 为上次保存的清单响应 {url, etag, data}，带 If-None-Match 发送，
+    服务器返回 304 时直接使用缓存内容，只传输响应头
+    返回 (文件列表, 状态字典, 新的清单缓存)，失败返回 (None, None, None)
+    """
+    def get(url):
+        headers = {}
+        if listing and listing.get("url") == url and listing.get("etag"):
+            headers["If-None-Match"] = listing["etag"]
+        return request_with_backoff(session, "GET", url, auth=_auth(), headers=headers, timeout=LIST_TIMEOUT)
+
+    try:
+        url = f"{server_url}/api/manifest"
+        resp = get(url)
+        if resp.status_code == 404:
+            url = f"{server_url}/api/files"
+            resp = get(url)
+        if resp.status_code == 304:
+            data = listing["data"]
+            etag = listing["etag"]
+        elif resp.status_code == 200:
+            data = resp.json()
+            etag = resp.headers.get("ETag")
+        else:
+            return None, None, None
+        if not data.get("success"):
+            return None, None, None
+        files = data.get("files") or []
+        status = {
+            "port": data.get("port"),
+            "files_count": data.get("files_count", len(files)),
+        }
+        new_listing = {"url": url, "etag": etag, "data": data} if etag else None
+        return files, status, new_listing
+    except Exception:
+        return None, None, None
+
+
+def fetch_page(session, server_url, page):
+    """
+    获取一页文件列表（/api/files 分页参数），page 为 {cursor, limit, sort, order, ext, prefix}，空值不发送
+    返回 (文件列表, 状态字典)，状态含 total（符合条件的文件总数）、next_cursor（最后一页为 None）
+    与 paged（旧版服务器忽略分页参数、返回全部文件时为 False）
+    失败返回 (None, None)
+    """
+    params = {k: v for k, v in page.items() if v}
+    try:
+        resp = request_with_backoff(session, "GET", f"{server_url}/api/files", params=params, auth=_auth(),
+                                    timeout=LIST_TIMEOUT)
+        if resp.status_code != 200:
+            return None, None
+        data = resp.json()
+        if not data.get("success"):
+            return None, None
+        files = data.get("files") or []
+        status = {
+            "files_count": data.get("total", len(files)),
+            "total": data.get("total", len(files)),
+            "next_cursor": data.get("next_cursor") or None,
+            "paged": "total" in data,
+        }
+        return files, status
+    except Exception:
+        return None, None
+
+
+class DownloadCancelled(RequestCancelled):
+    """下载被取消（等待限流重试时被取消抛出的是父类 RequestCancelled）"""
+
+
+def create_session(pool_size=None):
+    """
+    创建共享 keep-alive 连接池的会话，连接数与下载并发数一致
+    requests 默认发送 Accept-Encoding: gzip, deflate（安装 brotli 时含 br）并自动解压
+    """
+    pool_size = pool_size or DOWNLOAD_CONCURRENCY
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _remove_cached(name):
+    """删除缓存文件及其未完成的下载片段"""
+    with _file_lock(name):
+        _remove(_local_path(name))
+        _remove(_local_path(name) + ".part")
+
+
+def http_date(mtime_ns):
+    """纳秒时间戳转为 HTTP 日期（用作 If-Range 校验值）"""
+    return formatdate(mtime_ns / 1e9, usegmt=True)
+
+
+def _range_total(resp):
+    # Content-Range: bytes 100-999/1000
+    total = resp.headers.get("Content-Range", "").rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+
+def _download_part(session, server_url, name, tmp, on_progress, cancel_event, validator, etag, params=None):
+    """
+    下载到临时文件；有校验值且临时文件已存在时只请求剩余部分（Range + If-Range），
+    否则有 etag 时发送 If-None-Match；params 为附加的查询参数（缩略图尺寸，缩略图不支持续传，服务器返回完整内容）
+    返回 (结果, 服务器 ETag, 缩略图规格)，结果为 DONE / NOT_MODIFIED（本地副本未变化）/ RESTART（本地片段失效，需重新下载），
+    缩略图规格取自响应头 X-Image-Variant，服务器发送原图时为 None
+    """
+    offset = os.path.getsize(tmp) if validator and os.path.exists(tmp) else 0
+    headers = {}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        # 服务器文件已变化时 If-Range 不成立，服务器返回 200 与完整内容
+        headers["If-Range"] = validator
+    elif etag:
+        headers["If-None-Match"] = etag
+    # 服务器限流（429）或繁忙（503）时按 Retry-After 等待后重试
+    with request_with_backoff(session, "GET", f"{server_url}/download/{name}", cancel_event=cancel_event,
+                              params=params, auth=_auth(), headers=headers,
+                              timeout=DOWNLOAD_TIMEOUT, stream=True) as resp:
+        variant = resp.headers.get("X-Image-Variant")
+        if resp.status_code == 304:
+            return NOT_MODIFIED, resp.headers.get("ETag") or etag, variant
+        if resp.status_code == 416:
+            _remove(tmp)
+            return RESTART, None, None
+        resp.raise_for_status()
+        if offset and resp.status_code == 206:
+            mode = "ab"
+            total = _range_total(resp)
+        else:
+            mode = "wb"
+            offset = 0
+            total = int(resp.headers.get("Content-Length") or 0) or None
+            if resp.headers.get("Content-Encoding"):
+                # 压缩传输时 Content-Length 是压缩后的大小，进度按解压后的字节计算
+                total = None
+        done = offset
+        with open(tmp, mode) as f:
+            for chunk in resp.iter_content(HASH_CHUNK_SIZE):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise DownloadCancelled(name)
+                f.write(chunk)
+                done += len(chunk)
+                if on_progress:
+                    on_progress(name, done, total)
+        # 续传（206）得到的是原始字节的 ETag，与整体下载时的压缩表示不同，不作为校验值保存
+        return DONE, resp.headers.get("ETag") if mode == "wb" else None, variant
+
+
+def download_to_cache(session, server_url, name, on_progress=None, cancel_event=None, validator=None, etag=None,
+                      params=None):
+    """
+    下载单个文件到缓存目录（先写临时文件再替换）
+    on_progress(name, done_bytes, total_bytes): 下载进度回调，total 未知时为 None
+    validator: 服务器文件的 Last-Modified（HTTP 日期）；提供时中断或取消后保留 .part 片段，
+        连接中断时自动续传，下次同步也从断点继续；为空时每次完整下载
+    etag: 本地副本对应的服务器 ETag，本地文件存在时发送 If-None-Match，未变化则不传输内容
+    params: 附加的查询参数，如 {"w": 650, "h": 450} 请求服务器缩小后的图片
+    返回 (本地路径, 服务器 ETag, 是否重新下载, 缩略图规格)，服务器发送的是原图时缩略图规格为 None
+    """
+    # 同一文件的下载依次进行（包括已取消、尚未退出的下载与变化通知触发的下载），不会同时读写同一个 .part
+    with _file_lock(name):
+        path = _local_path(name)
+        tmp = path + ".part"
+        if not validator:
+            _remove(tmp)
+        if not os.path.exists(path):
+            etag = None
+        retries = 0
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise DownloadCancelled(name)
+                try:
+                    result, new_etag, variant = _download_part(session, server_url, name, tmp, on_progress,
+                                                      cancel_event, validator, etag, params)
+                except RESUMABLE_ERRORS:
+                    retries += 1
+                    if not validator or retries > DOWNLOAD_RETRIES:
+                        raise
+                    continue
+                if result == NOT_MODIFIED:
+                    return path, new_etag, False, variant
+                if result == DONE:
+                    break
+            os.replace(tmp, path)
+        except (RequestCancelled,) + RESUMABLE_ERRORS:
+            if not validator:
+                _remove(tmp)
+            raise
+        except BaseException:
+            _remove(tmp)
+            raise
+        return path, new_etag, True, variant
+
+
+class DownloadScheduler:
+    """
+    并发下载调度器
+    所有下载共享一个 keep-alive 连接池，同时进行的下载数不超过 concurrency，
+    高延迟链路上 N 个文件的总耗时从 N 个往返链缩短到约 N / concurrency 个
+    """
+
+    def __init__(self, server_url, concurrency=None, session=None, cancel_event=None):
+        self.server_url = server_url
+        self.concurrency = max(1, concurrency or DOWNLOAD_CONCURRENCY)
+        self.session = session or create_session(self.concurrency)
+        self.cancel_event = cancel_event
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency)
+
+    def submit(self, name, on_progress=None, validator=None, etag=None, params=None):
+        """提交一个下载任务，返回 Future，结果同 download_to_cache"""
+        return self._pool.submit(download_to_cache, self.session, self.server_url, name,
+                                 on_progress, self.cancel_event, validator, etag, params)
+
+    def close(self):
+        cancelled = self.cancel_event is not None and self.cancel_event.is_set()
+        self._pool.shutdown(wait=not cancelled)
+        self.session.close()
+
+
+def _with_expected_size(on_progress, size):
+    # 服务器未返回 Content-Length（分块传输）时，用清单中的大小计算进度
+    if not on_progress:
+        return None
+    return lambda name, done, total: on_progress(name, done, total or size or None)
+
+
+def _submit_download(scheduler, info, on_progress):
+    # 只有纳秒 mtime 能换算出与服务器 Last-Modified 一致的校验值，旧版服务器不续传
+    validator = http_date(info["mtime_ns"]) if info.get("mtime_ns") else None
+    params = None
+    if info.get("variant"):
+        w, _, h = info["variant"].partition("x")
+        params = {"w": w, "h": h}
+    return scheduler.submit(info["name"], _with_expected_size(on_progress, info.get("size")),
+                            validator, info.pop("etag", None), params)
+
+
+def _cache_entry(info, etag):
+    """由处理完成的文件信息生成本地清单条目"""
+    entry = {
+        "size": info.get("size"),
+        "mtime": _server_mtime(info),
+        "hash": info["hash"],
+        "etag": etag,
+    }
+    if info.get("variant"):
+        entry["variant"] = info["variant"]
+        entry["local_size"] = os.path.getsize(info["local_path"])
+    return entry
+
+
+def _finish_download(future, info):
+    """
+    等待下载完成并校验内容哈希，更新 info 的 local_path / hash / state，返回本地清单条目（失败返回 None）
+    服务器实际发送了缩略图（响应带 X-Image-Variant）时无法与原图哈希比对，hash 沿用服务器原图的哈希（缩略图缓存以此为键）；
+    请求缩略图但服务器发送原图（原图已足够小等）时照常校验
+    """
+    try:
+        path, etag, modified, variant = future.result()
+        local_hash = file_sha256(path)
+        if info.get("hash") and local_hash != info["hash"] and not variant:
+            raise ValueError(f"{info['name']} 内容校验失败")
+    except Exception:
+        info["local_path"] = None
+        info["state"] = "failed"
+        return None
+    info["local_path"] = path
+    if not (variant and info.get("hash")):
+        info["hash"] = local_hash
+    info["state"] = "downloaded" if modified else "unchanged"
+    return _cache_entry(info, etag)
+
+
+def _extract(zf, info, path):
+    """解出一个文件（先写临时文件再替换）；原样打包的文件校验内容哈希，不一致时返回 False"""
+    tmp = path + ".tmp"
+    h = hashlib.sha256()
+    with _file_lock(info["name"]):
+        try:
+            with zf.open(info["name"]) as src, open(tmp, "wb") as dst:
+                for chunk in iter(lambda: src.read(HASH_CHUNK_SIZE), b""):
+                    h.update(chunk)
+                    dst.write(chunk)
+            if not info.get("variant") and info.get("hash") and h.hexdigest() != info["hash"]:
+                _remove(tmp)
+                return False
+            os.replace(tmp, path)
+        except BaseException:
+            _remove(tmp)
+            raise
+    return True
+
+
+def _bundle_part_etag(part, params):
+    """未完成的压缩包片段对应的服务器 ETag；没有片段或请求参数不同时返回 None"""
+    try:
+        with open(part + ".json", "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get("params") != params or not os.path.exists(part):
+        return None
+    return state.get("etag")
+
+
+def _clear_bundle_part(part):
+    _remove(part)
+    _remove(part + ".json")
+
+
+def _download_bundle_part(session, server_url, params, part, on_progress, cancel_event):
+    """
+    下载压缩包到 part；片段已存在且记录了 ETag 时只请求剩余部分（Range + If-Range），
+    压缩包已变化时服务器返回完整内容。只有完整压缩包带 ETag、可以续传，增量压缩包每次重新下载
+    返回 DONE / RESTART（片段失效，需重新下载），服务器不支持打包时返回 None
+    """
+    etag = _bundle_part_etag(part, params)
+    offset = os.path.getsize(part) if etag else 0
+    headers = {}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = etag
+    with request_with_backoff(session, "GET", f"{server_url}/api/bundle", cancel_event=cancel_event,
+                              params=params, auth=_auth(), headers=headers,
+                              timeout=(LIST_TIMEOUT, DOWNLOAD_TIMEOUT), stream=True) as resp:
+        if resp.status_code == 404:
+            return None
+        if resp.status_code == 416:
+            _clear_bundle_part(part)
+            return RESTART
+        resp.raise_for_status()
+        if offset and resp.status_code == 206:
+            mode = "ab"
+            total = _range_total(resp)
+        else:
+            mode = "wb"
+            offset = 0
+            total = int(resp.headers.get("Content-Length") or 0) or None
+            # 记录本次下载的 ETag，中断后（包括下次同步）据此续传
+            with open(part + ".json", "w", encoding="utf-8") as f:
+                json.dump({"params": params, "etag": resp.headers.get("ETag")}, f)
+        done = offset
+        with open(part, mode) as f:
+            for chunk in resp.iter_content(HASH_CHUNK_SIZE):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise DownloadCancelled(BUNDLE_PART_NAME)
+                f.write(chunk)
+                done += len(chunk)
+                if on_progress:
+                    on_progress(done, total)
+    return DONE
+
+
+def _unpack_bundle(part, wanted):
+    """解包到缓存目录，返回包内清单；files 只含已解包的文件（附加 local_path）"""
+    with zipfile.ZipFile(part) as zf:
+        bundle = json.loads(zf.read(BUNDLE_MANIFEST_NAME).decode("utf-8"))
+        files = []
+        for info in bundle.get("files") or []:
+            name = info.get("name", "")
+            # 只接受不含路径的文件名，防止解包到缓存目录之外
+            if not name or os.path.basename(name) != name:
+                continue
+            if wanted is not None and name not in wanted:
+                continue
+            path = _local_path(name)
+            if _extract(zf, info, path):
+                info["local_path"] = path
+                files.append(info)
+    bundle["files"] = files
+    for name in bundle.get("deleted") or []:
+        if wanted is None or name in wanted:
+            _remove_cached(name)
+    return bundle
+
+
+def download_bundle(session, server_url, since=None, image_size=None, cancel_event=None, wanted=None,
+                    on_progress=None):
+    """
+    下载服务器打包的文件（/api/bundle）并一次解包到缓存目录
+    since: 上次解包的版本号，提供时只下载此后变化的文件（服务器变化记录不完整时仍返回全部文件）
+    image_size: (宽, 高)，图片在包内为缩小到该尺寸以内的版本
+    wanted: 只解包这些文件名，为空时解包全部
+    on_progress(done_bytes, total_bytes): 压缩包下载进度（total 未知时为 None）
+    完整压缩包连接中断时自动续传，取消或失败后保留片段，下次同样的请求从断点继续
+    返回包内清单 {version, full, files, deleted}（见 _unpack_bundle）；
+    服务器不支持打包、下载失败或被取消时返回 None，由调用方逐个下载
+    """
+    if server_url in _no_bundle:
+        return None
+    params = {}
+    if since is not None:
+        params["since"] = since
+    if image_size:
+        params["w"], params["h"] = image_size
+    part = os.path.join(get_cache_folder(), BUNDLE_PART_NAME)
+    with _file_lock(BUNDLE_PART_NAME):
+        if _bundle_part_etag(part, params) is None:
+            _clear_bundle_part(part)
+        retries = 0
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                try:
+                    result = _download_bundle_part(session, server_url, params, part, on_progress, cancel_event)
+                except RESUMABLE_ERRORS:
+                    retries += 1
+                    if _bundle_part_etag(part, params) is None or retries > DOWNLOAD_RETRIES:
+                        raise
+                    continue
+                if result is None:
+                    _no_bundle.add(server_url)
+                    _clear_bundle_part(part)
+                    return None
+                if result == DONE:
+                    break
+            bundle = _unpack_bundle(part, wanted)
+        except (RequestCancelled,) + RESUMABLE_ERRORS:
+            # 可以续传的片段留到下次同步
+            if _bundle_part_etag(part, params) is None:
+                _clear_bundle_part(part)
+            return None
+        except (requests.RequestException, zipfile.BadZipFile, OSError, ValueError, KeyError):
+            _clear_bundle_part(part)
+            return None
+        _clear_bundle_part(part)
+        return bundle
+
+
+def _page_range(page, files, status):
+    """
+    返回判断本地清单条目是否落在本页排序范围内的函数 in_page(name, entry)；
+    第一页向前、最后一页向后不设界。带 ext / prefix 过滤或无法判断（空的中间页）时返回 None
+    """
+    if page.get("ext") or page.get("prefix"):
+        return None
+    by_mtime = page.get("sort") == "mtime"
+    desc = page.get("order", "desc" if by_mtime else "asc") == "desc"
+
+    def key(name, mtime):
+        return (mtime, name) if by_mtime else (name,)
+
+    keys = [key(f.get("name", ""), f.get("mtime_ns")) for f in files]
+    if by_mtime and any(k[0] is None for k in keys):
+        return None
+    first_page = not page.get("cursor")
+    last_page = not status.get("next_cursor")
+    if not keys and not (first_page and last_page):
+        return None
+    lo = min(keys) if keys else None
+    hi = max(keys) if keys else None
+    # 排序方向上的起点一侧在第一页不设界，终点一侧在最后一页不设界
+    if first_page:
+        if desc:
+            hi = None
+        else:
+            lo = None
+    if last_page:
+        if desc:
+            lo = None
+        else:
+            hi = None
+
+    def in_page(name, entry):
+        mtime = entry.get("mtime")
+        if by_mtime and not isinstance(mtime, int):
+            return False
+        k = key(name, mtime)
+        return (lo is None or k >= lo) and (hi is None or k <= hi)
+    return in_page
+
+
+def fetch_changes_version(session, server_url):
+    """读取服务器变化通知的当前版本号；旧版服务器没有 /api/changes 时返回 None"""
+    try:
+        resp = request_with_backoff(session, "GET", f"{server_url}/api/changes", auth=_auth(), timeout=LIST_TIMEOUT)
+        if resp.status_code != 200:
+            return None
+        return resp.json().get("version")
+    except Exception:
+        return None
+
+
+def sync_server_files(server_url, on_progress=None, on_manifest=None, on_file_done=None,
+                      concurrency=None, cancel_event=None, page=None, image_size=None):
+    """
+    增量同步服务器文件到本地缓存；需要下载多个文件时先下载压缩包一次解包（见 download_bundle），
+    包内没有的文件（以及旧版服务器上的全部文件）由 DownloadScheduler 并发下载
+    on_manifest(files, server_status): 拿到服务器清单、开始下载前回调一次，
+        files 每项附加 state：unchanged（本地已是最新）或 pending（等待下载）
+    on_progress(name, done_bytes, total_bytes): 单个文件下载进度（在下载线程中回调）
+    on_file_done(info): 单个文件处理完成，info 附加 local_path（失败为 None）、hash（本地副本 SHA-256）与 state
+        state 为 unchanged / downloaded / failed
+    cancel_event: threading.Event，置位后停止下载并立即返回（不更新本地清单）
+    page: 分页条件（见 fetch_page），提供时只同步这一页的文件（逐个下载，不使用压缩包），
+        服务器状态附加 total / next_cursor / paged
+    image_size: (宽, 高)，提供时图片只下载服务器缩小到该尺寸以内的版本，本地缓存保存缩略图而非原图
+    返回 (是否连接成功, 文件列表, 服务器状态)
+    服务器状态中的 changes_version 为拉取清单前的变化版本号（旧版服务器为 None），
+    交给 ChangeFeed 后只会收到此后的变化，同步期间发生的变化也不会遗漏
+    """
+    scheduler = DownloadScheduler(server_url, concurrency=concurrency, cancel_event=cancel_event)
+    try:
+        changes_version = fetch_changes_version(scheduler.session, server_url)
+        if page is not None:
+            files, server_status = fetch_page(scheduler.session, server_url, page)
+            listing = load_listing()
+        else:
+            files, server_status, listing = fetch_manifest(scheduler.session, server_url, load_listing())
+        if files is None:
+            return False, [], None
+        server_status["changes_version"] = changes_version
+        paged = bool(server_status.get("paged"))
+
+        manifest = load_manifest()
+        # 分页时只处理本页的文件，其他文件的本地清单条目保持不变
+        page_names = {file_info.get("name") for file_info in files}
+        new_manifest = {k: v for k, v in manifest.items() if k not in page_names} if paged else {}
+        result = []
+        futures = {}
+        for file_info in files:
+            name = file_info.get("name", "")
+            if not name:
+                continue
+            info = dict(file_info)
+            info["variant"] = _variant_for(name, image_size)
+            entry = manifest.get(name)
+            if _is_current(info, entry):
+                new_manifest[name] = entry
+                info["local_path"] = _local_path(name)
+                info["hash"] = entry.get("hash")
+                info["state"] = "unchanged"
+            else:
+                info["local_path"] = None
+                info["state"] = "pending"
+                # 本地仍有旧副本时带上其 ETag，服务器内容未变（如仅 mtime 变化）时返回 304
+                info["etag"] = (entry or {}).get("etag")
+            result.append(info)
+
+        if on_manifest:
+            on_manifest([dict(info) for info in result], server_status)
+
+        # 需要下载多个文件时先下载压缩包一次解包，包内没有的文件再逐个下载；
+        # 压缩包按目录打包、无法只包含某一页，分页时只逐个下载本页的文件
+        bundle_version = load_bundle_version()
+        pending = {info["name"]: info for info in result if info["state"] == "pending"}
+        if not paged and len(pending) >= BUNDLE_MIN_FILES:
+            # 本地没有缓存或从未解包过时不带版本号，下载全部文件
+            since = bundle_version if manifest else None
+
+            def bundle_progress(done, total):
+                # 压缩包的下载进度显示在每个等待中的文件上
+                for name in pending:
+                    on_progress(name, done, total)
+
+            bundle = download_bundle(scheduler.session, server_url, since, image_size, cancel_event,
+                                     wanted=set(pending),
+                                     on_progress=bundle_progress if on_progress else None)
+            if cancel_event is not None and cancel_event.is_set():
+                return False, [], None
+            if bundle is not None:
+                # 服务器上已删除的文件由下方按清单统一删除
+                bundle_version = bundle.get("version")
+                for file_info in bundle["files"]:
+                    name = file_info["name"]
+                    info = pending.get(name)
+                    if info is None:
+                        continue
+                    info.update((k, file_info[k]) for k in ("size", "modified", "mtime_ns", "hash") if k in file_info)
+                    info.update(local_path=file_info["local_path"], state="downloaded",
+                                variant=_variant_for(name, image_size))
+                    info.pop("etag", None)
+                    new_manifest[name] = _cache_entry(info, None)
+
+        # 先把全部下载提交给调度器，界面可在下载进行时构建标签页
+        for info in result:
+            if info["state"] == "pending":
+                futures[_submit_download(scheduler, info, on_progress)] = info
+            elif on_file_done:
+                on_file_done(dict(info))
+
+        for future in as_completed(futures):
+            info = futures[future]
+            entry = _finish_download(future, info)
+            if entry:
+                new_manifest[info["name"]] = entry
+            if cancel_event is not None and cancel_event.is_set():
+                return False, [], None
+            if on_file_done:
+                on_file_done(dict(info))
+
+        # 删除服务器上已不存在的文件的本地副本（只删除清单中记录过的文件）；
+        # 分页时只能判断本页覆盖的排序范围：范围内但不在本页的文件已被删除（或已修改、移到了其他页）
+        if not paged:
+            server_names = {info["name"] for info in result}
+            for name in set(manifest) - server_names:
+                _remove_cached(name)
+        else:
+            in_page = _page_range(page, files, server_status)
+            if in_page:
+                for name in list(new_manifest):
+                    if name not in page_names and in_page(name, new_manifest[name]):
+                        del new_manifest[name]
+                        _remove_cached(name)
+
+        # 重新读取后合并，只改动本次同步下载或删除的条目；同步期间变化通知（sync_changed_files）保存的条目不被旧副本覆盖
+        with _manifest_lock:
+            current = load_manifest()
+            for name in set(manifest) - set(new_manifest):
+                current.pop(name, None)
+            for name, entry in new_manifest.items():
+                if manifest.get(name) is not entry:
+                    current[name] = entry
+            save_manifest(current, listing, bundle_version)
+        return True, result, server_status
+    finally:
+        scheduler.close()
+
+
+def sync_changed_files(server_url, changes, on_progress=None, on_file_done=None,
+                       concurrency=None, cancel_event=None, image_size=None):
+    """
+    只同步变化通知中列出的文件，不再拉取清单
+    changes: /api/changes 返回的变化列表，每项为文件信息加 op（modified / deleted）
+    回调同 sync_server_files；已删除的文件也回调 on_file_done，state 为 deleted
+    多批变化依次处理（同一文件不会同时下载），返回处理后的文件信息列表
+    """
+    with _changes_lock:
+        scheduler = DownloadScheduler(server_url, concurrency=concurrency, cancel_event=cancel_event)
+        try:
+            manifest = load_manifest()
+            updates = {}
+            result = []
+            futures = {}
+            for change in changes:
+                name = change.get("name", "")
+                if not name:
+                    continue
+                info = dict(change)
+                op = info.pop("op", "modified")
+                info["variant"] = _variant_for(name, image_size)
+                entry = manifest.get(name)
+                if op == "deleted":
+                    _remove_cached(name)
+                    updates[name] = None
+                    info.update(local_path=None, state="deleted")
+                elif _is_current(info, entry):
+                    info.update(local_path=_local_path(name), hash=entry.get("hash"), state="unchanged")
+                else:
+                    info.update(local_path=None, state="pending", etag=(entry or {}).get("etag"))
+                    futures[_submit_download(scheduler, info, on_progress)] = info
+                result.append(info)
+                if info["state"] != "pending" and on_file_done:
+                    on_file_done(dict(info))
+
+            for future in as_completed(futures):
+                info = futures[future]
+                entry = _finish_download(future, info)
+                if entry:
+                    updates[info["name"]] = entry
+                if cancel_event is not None and cancel_event.is_set():
+                    return result
+                if on_file_done:
+                    on_file_done(dict(info))
+
+            # 重新读取后合并，只改动本批涉及的条目
+            with _manifest_lock:
+                manifest = load_manifest()
+                for name, entry in updates.items():
+                    if entry is None:
+                        manifest.pop(name, None)
+                    else:
+                        manifest[name] = entry
+                save_manifest(manifest, load_listing(), load_bundle_version())
+            return result
+        finally:
+            scheduler.close()
@@ -0,0 +1,154 @@
+"""
+大文本文件查看器
+按块读取本地文件并建立行偏移索引，文本框中只保留可见区域及前后余量的若干行，
+滚动到窗口边缘时再读取相邻的行；可以通过行号直接跳转。
+每次读取都重新打开文件，不长期占用文件句柄，后台同步仍可替换该文件。
+"""
+import os
+import tkinter as tk
+from array import array
+from tkinter import ttk
+
+# 建索引 / 读取时每块的大小
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def build_line_index(path):
+    """
+    分块扫描文件，返回每行起始字节偏移的数组，末尾附加文件大小作为结束哨兵
+    行数 = len(offsets) - 1
+    """
+    offsets = array("q", [0])
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            pos = chunk.find(b"\n")
+            while pos != -1:
+                offsets.append(size + pos + 1)
+                pos = chunk.find(b"\n", pos + 1)
+            size += len(chunk)
+    if offsets[-1] != size:
+        offsets.append(size)
+    return offsets
+
+
+class LargeTextViewer(tk.Frame):
+    """只加载可见窗口的只读文本查看器"""
+
+    # 文本框中同时保留的行数
+    WINDOW_LINES = 600
+    # 可见区域距离窗口边缘少于该行数时重新加载窗口
+    MARGIN_LINES = 150
+
+    def __init__(self, parent, path, font=("微软雅黑", 10), **kwargs):
+        super().__init__(parent, bg="white", **kwargs)
+        self.path = path
+        self.text = tk.Text(self, wrap=tk.WORD, font=font, yscrollcommand=lambda *args: self._update_scrollbar())
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.text.tag_configure("goto", background="#FEF3C7")
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.text.bind(seq, self._on_mousewheel)
+
+        self.win_start = 0
+        self.win_end = 0
+        self._reindex()
+        self._load_window(0)
+
+    @property
+    def total_lines(self):
+        return len(self.offsets) - 1
+
+    def _reindex(self):
+        st = os.stat(self.path)
+        self._file_sig = (st.st_size, st.st_mtime)
+        self.offsets = build_line_index(self.path)
+
+    def _read_lines(self, start, end):
+        """读取 [start, end) 行的文本"""
+        st = os.stat(self.path)
+        if (st.st_size, st.st_mtime) != self._file_sig:
+            # 文件已被同步替换，重建索引
+            self._reindex()
+            end = min(end, self.total_lines)
+            start = min(start, end)
+        with open(self.path, "rb") as f:
+            f.seek(self.offsets[start])
+            data = f.read(self.offsets[end] - self.offsets[start])
+        return data.decode("utf-8", errors="ignore")
+
+    def _load_window(self, top_line):
+        """以 top_line 为可见首行重新加载窗口"""
+        total = self.total_lines
+        top_line = max(0, min(top_line, max(0, total - 1)))
+        start = max(0, top_line - self.MARGIN_LINES)
+        end = min(total, start + self.WINDOW_LINES)
+        start = max(0, end - self.WINDOW_LINES)
+        content = self._read_lines(start, end)
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", content)
+        self.text.config(state=tk.DISABLED)
+        self.win_start, self.win_end = start, min(end, self.total_lines)
+        self.text.yview(f"{top_line - start + 1}.0")
+        self._update_scrollbar()
+
+    def _visible_range(self):
+        """返回当前可见的 (首行, 末行)，为整个文件中的行号（从 0 开始）"""
+        first = int(self.text.index("@0,0").split(".")[0]) - 1
+        last = int(self.text.index(f"@0,{max(1, self.text.winfo_height())}").split(".")[0]) - 1
+        return self.win_start + first, self.win_start + last
+
+    def _update_scrollbar(self):
+        total = self.total_lines
+        if total <= 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        top, bottom = self._visible_range()
+        self.scrollbar.set(top / total, min(1.0, (bottom + 1) / total))
+
+    def _after_scroll(self):
+        """文本框内滚动后，接近窗口边缘时加载相邻的行"""
+        top, bottom = self._visible_range()
+        near_top = self.win_start > 0 and top - self.win_start < self.MARGIN_LINES
+        near_bottom = self.win_end < self.total_lines and self.win_end - bottom < self.MARGIN_LINES
+        if near_top or near_bottom:
+            self._load_window(top)
+        else:
+            self._update_scrollbar()
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            target = int(float(args[1]) * self.total_lines)
+            if self.win_start <= target < self.win_end - self.MARGIN_LINES:
+                self.text.yview(f"{target - self.win_start + 1}.0")
+                self._after_scroll()
+            else:
+                self._load_window(target)
+        elif args[0] == "scroll":
+            self.text.yview_scroll(int(args[1]), args[2])
+            self._after_scroll()
+
+    def _on_mousewheel(self, event):
+        if event.num == 4:
+            delta = -3
+        elif event.num == 5:
+            delta = 3
+        else:
+            delta = -3 if event.delta > 0 else 3
+        self.text.yview_scroll(delta, "units")
+        self._after_scroll()
+        return "break"
+
+    def goto_line(self, line_no):
+        """跳转到指定行（从 1 开始）并高亮该行"""
+        line = max(0, min(int(line_no) - 1, self.total_lines - 1))
+        self._load_window(line)
+        index = f"{line - self.win_start + 1}.0"
+        self.text.tag_remove("goto", "1.0", tk.END)
+        self.text.tag_add("goto", index, f"{index} lineend")
+        return line + 1
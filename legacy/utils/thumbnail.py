@@ -0,0 +1,96 @@
+"""
+图片缩略图磁盘缓存
+按内容哈希和目标尺寸缓存缩放后的图片，内容未变化时再次打开页面无需完整解码原图。
+未命中时先用 JPEG draft 模式或 reduce() 降低解码分辨率，再做 LANCZOS 重采样。
+"""
+import os
+
+from PIL import Image
+
+from utils.cache import get_cache_folder
+
+# 缩略图目录（缓存目录下的子目录，不受文件同步清单影响）
+THUMB_FOLDER_NAME = "thumbs"
+# 最多保留的缩略图数量，超出后删除最久未使用的
+THUMB_CACHE_MAX_FILES = 200
+
+
+def get_thumb_folder():
+    folder = os.path.join(get_cache_folder(), THUMB_FOLDER_NAME)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def fit_size(width, height, max_width, max_height):
+    """按比例缩放到不超过 max_width x max_height 的尺寸"""
+    ratio = min(max_width / width, max_height / height)
+    return max(1, int(width * ratio)), max(1, int(height * ratio))
+
+
+def _thumb_path(content_hash, max_width, max_height):
+    return os.path.join(get_thumb_folder(), f"{content_hash}_{max_width}x{max_height}.png")
+
+
+def _to_rgb(img):
+    """转换为 RGB（带透明度时为 RGBA）"""
+    if img.mode in ("RGB", "RGBA"):
+        return img
+    return img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+
+
+def _decode_reduced(path, max_width, max_height):
+    """以尽量低的分辨率解码原图并缩放到目标尺寸"""
+    img = Image.open(path)
+    target = fit_size(img.size[0], img.size[1], max_width, max_height)
+    if img.format == "JPEG":
+        # draft 让 JPEG 解码器直接按 1/2、1/4、1/8 比例解码，不小于目标尺寸
+        img.draft("RGB", target)
+    else:
+        # reduce() 不支持调色板（GIF、8 位 PNG）与 1 位图，先转换模式
+        img = _to_rgb(img)
+        factor = min(img.size[0] // target[0], img.size[1] // target[1])
+        if factor >= 2:
+            img = img.reduce(factor)
+    return _to_rgb(img).resize(target, Image.Resampling.LANCZOS)
+
+
+def _prune():
+    try:
+        folder = get_thumb_folder()
+        entries = [os.path.join(folder, n) for n in os.listdir(folder)]
+        if len(entries) <= THUMB_CACHE_MAX_FILES:
+            return
+        entries.sort(key=os.path.getmtime)
+        for p in entries[:len(entries) - THUMB_CACHE_MAX_FILES]:
+            os.remove(p)
+    except OSError:
+        pass
+
+
+def load_thumbnail(path, content_hash, max_width=650, max_height=450):
+    """
+    返回缩放到 max_width x max_height 以内的 PIL 图片
+    content_hash 为原图内容哈希；命中缓存时只解码小尺寸缩略图，为空时不使用缓存
+    """
+    if not content_hash:
+        return _decode_reduced(path, max_width, max_height)
+    thumb = _thumb_path(content_hash, max_width, max_height)
+    if os.path.exists(thumb):
+        try:
+            img = Image.open(thumb)
+            img.load()
+            # 更新访问时间，供清理时判断最近使用
+            os.utime(thumb, None)
+            return img
+        except Exception:
+            pass
+
+    img = _decode_reduced(path, max_width, max_height)
+    try:
+        tmp = thumb + ".tmp"
+        img.save(tmp, format="PNG")
+        os.replace(tmp, thumb)
+        _prune()
+    except OSError:
+        pass
+    return img